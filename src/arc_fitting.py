@@ -0,0 +1,126 @@
+import math
+import numpy as np
+import fullcontrol as fc
+from toolpath import PRINT, TRAVEL
+
+MAX_RADIUS = 1000 # mm. Runs that are flatter than this are left as straight moves
+MIN_SEGMENTS = 3 # Smallest number of straight moves that is replaced by an arc
+
+class ArcMove:
+    """ G2/G3 move from the current position to end, around (center_x, center_y).
+    Extrudes as much as the straight moves it replaces, which have a total length of length.
+    """
+    def __init__(self, end, center_x, center_y, clockwise, length):
+        self.end = end
+        self.center_x = center_x
+        self.center_y = center_y
+        self.clockwise = clockwise
+        self.length = length
+
+    def gcode(self, state):
+        start = state.point
+        G_str = 'G2 ' if self.clockwise else 'G3 '
+        F_str = state.printer.f_gcode(state)
+        XY_str = f'X{self.end.x:.6f}'.rstrip('0').rstrip('.') + ' ' + f'Y{self.end.y:.6f}'.rstrip('0').rstrip('.') + ' '
+        IJ_str = f'I{self.center_x - start.x:.6f}'.rstrip('0').rstrip('.') + ' ' + f'J{self.center_y - start.y:.6f}'.rstrip('0').rstrip('.') + ' '
+        if state.extruder.on:
+            E_str = f'E{state.extruder.get_and_update_volume(self.length*state.extrusion_geometry.area)*state.extruder.volume_to_e:.6f}'.rstrip('0').rstrip('.')
+        else:
+            E_str = state.extruder.e_gcode(self.end, state)
+        state.printer.speed_changed = False
+        state.point.update_from(self.end)
+        return f'{G_str}{F_str}{XY_str}{IJ_str}{E_str}'.strip()
+
+def circle_center(x1, y1, x2, y2, x3, y3):
+    # Center of the circle through three points, None if they are on a line.
+    # Computed relative to the first point for precision.
+    bx, by = x2 - x1, y2 - y1
+    cx, cy = x3 - x1, y3 - y1
+    d = 2 * (bx * cy - by * cx)
+    if d == 0:
+        return None
+    b = bx * bx + by * by
+    c = cx * cx + cy * cy
+    return x1 + (cy * b - by * c) / d, y1 + (bx * c - cx * b) / d
+
+def fit_arc(x, y, first, last, tolerance):
+    # (center x, center y, clockwise) of an arc through the points first..last that doesn't leave any point
+    # or any straight move between them by more than tolerance, or None if there is no such arc
+    middle = (first + last) // 2
+    center = circle_center(x[first].item(), y[first].item(), x[middle].item(), y[middle].item(), x[last].item(), y[last].item())
+    if center is None:
+        return None
+    center_x, center_y = center
+    radius = math.hypot(x[first] - center_x, y[first] - center_y)
+    if radius > MAX_RADIUS:
+        return None
+
+    px = x[first:last+1] - center_x
+    py = y[first:last+1] - center_y
+    if np.abs(np.hypot(px, py) - radius).max() > tolerance:
+        return None
+
+    # Every move has to turn the same way around the center, by less than a full circle in total
+    angles = np.arctan2(px[:-1] * py[1:] - py[:-1] * px[1:], px[:-1] * px[1:] + py[:-1] * py[1:])
+    if not ((angles > 0).all() or (angles < 0).all()):
+        return None
+    if abs(angles.sum()) >= 2 * math.pi - 1e-6:
+        return None
+
+    # Distance between the arc and the straight moves
+    if (radius * (1 - np.cos(angles / 2))).max() > tolerance:
+        return None
+    return center_x, center_y, bool(angles[0] < 0)
+
+def find_arcs(toolpath, features, tolerance):
+    # Runs of printed moves of the given features that can be replaced by arcs, as a dict for Toolpath.to_steps:
+    # row the arc starts from: (last row of the arc, ArcMove)
+    x, y, z, move = toolpath.x, toolpath.y, toolpath.z, toolpath.move
+    position = ((move == PRINT) | (move == TRAVEL)) & ~(np.isnan(x) | np.isnan(y) | np.isnan(z))
+    # Rows that can be the end of a move in an arc: printed, of a selected feature and at the same z as the row before
+    eligible = position & (move == PRINT) & np.isin(toolpath.feature, list(features))
+    eligible[1:] &= position[:-1] & (z[1:] == z[:-1])
+    if len(eligible):
+        eligible[0] = False
+
+    lengths = np.hypot(np.diff(x), np.diff(y))
+    distance = np.concatenate([[0.0], np.cumsum(np.nan_to_num(lengths))])
+
+    edges = np.diff(np.concatenate([[False], eligible, [False]]).astype(np.int8))
+    run_firsts = np.flatnonzero(edges == 1) - 1
+    run_lasts = np.flatnonzero(edges == -1) - 1
+
+    arcs = {}
+    for first, last in zip(run_firsts.tolist(), run_lasts.tolist()):
+        start = first
+        while last - start >= MIN_SEGMENTS:
+            end = start + MIN_SEGMENTS
+            fit = fit_arc(x, y, start, end, tolerance)
+            if fit is None:
+                start += 1
+                continue
+
+            # Grow the arc in doubling steps until it doesn't fit, then find the longest one that fits in between
+            step = MIN_SEGMENTS
+            too_far = None
+            while end < last:
+                candidate = min(end + step, last)
+                candidate_fit = fit_arc(x, y, start, candidate, tolerance)
+                if candidate_fit is None:
+                    too_far = candidate
+                    break
+                end, fit = candidate, candidate_fit
+                step *= 2
+            while too_far is not None and too_far - end > 1:
+                candidate = (end + too_far) // 2
+                candidate_fit = fit_arc(x, y, start, candidate, tolerance)
+                if candidate_fit is None:
+                    too_far = candidate
+                else:
+                    end, fit = candidate, candidate_fit
+
+            center_x, center_y, clockwise = fit
+            end_point = fc.Point(x=x[end].item(), y=y[end].item(), z=z[end].item())
+            arcs[start] = (end, ArcMove(end_point, center_x, center_y, clockwise, (distance[end] - distance[start]).item()))
+            start = end
+    return arcs
@@ -0,0 +1,133 @@
+""" Generate many variants of a wing in one run.
+
+    python src/batch.py wings.toml --jobs 4
+
+The manifest is a .toml or .json file with the settings every variant shares under "base", and the variants
+as a list under "variants". Each variant has a "name" and the settings it changes. A "sweep" of settings
+to lists of values adds a variant for every combination of the values:
+
+    [base]
+    z_positions = [0, 150]
+
+    [[variants]]
+    name = "tapered"
+    chord_lengths = [100, 60]
+
+    [sweep]
+    infill_density = [4, 6, 8]
+    naca_nums = [["2412", "2412"], ["0012", "0012"]]
+
+Settings that aren't given use the values in parameters.py. Every variant is written to <output dir>/<name>.gcode
+and a summary of all of them to a CSV file. Profiles and contours are loaded once, before the worker processes are started.
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+import fullcontrol as fc
+from config import WingConfig, load_settings
+from estimate import print_time
+from gcode_stream import write_gcode
+from metrics import Metrics
+from parallel import parallel_map
+from wing import section_contour, wing_toolpaths
+
+SUMMARY_FIELDS = ["name", "gcode", "layers", "points", "extruded_length", "travel_length", "estimated_print_time", "wall_time", "error"]
+
+def manifest_variants(manifest):
+    # List of (name, settings) of the variants in a manifest dict
+    base = manifest.get("base", {})
+    variants = []
+    for k, variant in enumerate(manifest.get("variants", [])):
+        variant = dict(variant)
+        name = variant.pop("name", f"variant_{k + 1:03d}")
+        variants.append((name, {**base, **variant}))
+
+    sweep = manifest.get("sweep", {})
+    if sweep:
+        names = list(sweep)
+        for values in itertools.product(*(sweep[name] for name in names)):
+            settings = dict(zip(names, values))
+            label = "_".join(f"{name}-{sweep_label(value)}" for name, value in settings.items())
+            variants.append((label, {**base, **settings}))
+
+    duplicates = {name for name, _ in variants if sum(1 for other, _ in variants if other == name) > 1}
+    if duplicates:
+        raise ValueError(f"Variant names must be unique: {', '.join(sorted(duplicates))}")
+    return variants
+
+def sweep_label(value):
+    if isinstance(value, (list, tuple)):
+        return "-".join(sweep_label(item) for item in value)
+    return str(value)
+
+def run_variant(name, settings, output_dir):
+    # Generate one variant and write its G-code. Returns its row of the summary.
+    start = time.perf_counter()
+    row = {"name": name}
+    try:
+        config = WingConfig(**settings)
+        controls = fc.GcodeControls(printer_name='generic', save_as=os.path.join(output_dir, name), include_date=False, initialization_data=config.printer_settings)
+        with Metrics() as metrics:
+            row["gcode"] = write_gcode(wing_toolpaths(config, jobs=1), controls, show_tips=False, arc_features=config.arc_features, arc_tolerance=config.arc_tolerance)
+        totals = metrics.totals()
+        row.update(layers=totals["layers"], points=totals["points"], extruded_length=round(totals["extruded_length"], 1), travel_length=round(totals["travel_length"], 1),
+                   estimated_print_time=round(print_time(config, totals["extruded_length"], totals["travel_length"])))
+    except Exception as error:  # One broken variant shouldn't stop the rest of the batch
+        row["error"] = f"{type(error).__name__}: {error}"
+    row["wall_time"] = round(time.perf_counter() - start, 3)
+    return row
+
+def load_shared(variants):
+    # Load the profiles and contours of every variant in this process, so worker processes forked from it already have them
+    for name, settings in variants:
+        try:
+            config = WingConfig(**settings)
+            for i in range(len(config.z_positions) - 1):
+                section_contour(config, i)
+        except Exception:  # Reported when the variant is run
+            pass
+
+def run_batch(variants, output_dir, jobs=1, summary_path=None, verbose=True):
+    # Generate every variant and return the rows of the summary. The summary is also written to summary_path if it is given.
+    os.makedirs(output_dir, exist_ok=True)
+    load_shared(variants)
+
+    tasks = ((name, settings, output_dir) for name, settings in variants)
+    results = parallel_map(run_variant, tasks, jobs) if jobs > 1 else (run_variant(*task) for task in tasks)
+    rows = []
+    for row in results:
+        rows.append(row)
+        if verbose:
+            if "error" in row:
+                print(f"{row['name']}: failed, {row['error']}")
+            else:
+                print(f"{row['name']}: {row['layers']} layers, {row['points']} points, about {row['estimated_print_time'] / 60:.0f} min, generated in {row['wall_time']:.2f} s")
+
+    if summary_path is not None:
+        with open(summary_path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the wing variants of a manifest file.")
+    parser.add_argument("manifest", help=".toml or .json file with the variants")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of variants generated at the same time (default: %(default)s)")
+    parser.add_argument("--output-dir", default="batch_output", help="Folder the G-code files are written to (default: %(default)s)")
+    parser.add_argument("--summary", help="CSV file for the summary (default: summary.csv in the output folder)")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    variants = manifest_variants(load_settings(args.manifest))
+    summary_path = args.summary or os.path.join(args.output_dir, "summary.csv")
+    rows = run_batch(variants, args.output_dir, args.jobs, summary_path)
+    failed = sum(1 for row in rows if "error" in row)
+    print(f"Generated {len(rows) - failed} of {len(rows)} variants in {time.time() - start:.1f} s. Summary: {summary_path}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
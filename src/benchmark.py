@@ -0,0 +1,207 @@
+""" Benchmark of the generation pipeline.
+
+Sweeps one setting at a time around a baseline wing and records the wall time of each stage, the peak memory
+and the number of points for every case. Each case runs in its own process so the peak memory is its own.
+Results are appended to a JSON history file so the scaling curves can be followed over time.
+
+    python src/benchmark.py                 # run all sweeps and append the results to the history
+    python src/benchmark.py --quick         # smaller sweeps
+    python src/benchmark.py --compare       # also fail if a stage got slower than in the previous run
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# Baseline wing that every sweep starts from. Output, printing to the console and the layer cache are turned off.
+BASELINE = {
+    "z_positions": [0, 20],
+    "num_points": 128,
+    "infill_density": 6,
+    "file_extraction": False,
+    "generate_circle": False,
+    "filled_layers_enabled": False,
+    "filled_layers": [0, 0.3, 0.6, 9.9, 10.2, 10.5],
+    "gcode_generation": False,
+    "print_total_layers": False,
+    "print_rendering_plot": False,
+    "print_rendering_plot_done": False,
+    "print_generating_gcode": False,
+    "print_time_taken": False,
+    "layer_cache_dir": None,
+}
+
+# Settings of the file extraction cases
+FILE_EXTRACTION = {"file_extraction": True, "filenames": ["clarky.dat", "clarky.dat"], "profile_cache_dir": None}
+
+# name: list of (case name, settings)
+SWEEPS = {
+    "height": [(f"height={height}", {"z_positions": [0, height]}) for height in (10, 20, 40, 80)],
+    "num_points": [(f"num_points={points}", {"num_points": points}) for points in (32, 64, 128, 256, 512)],
+    "infill_density": [(f"infill_density={density}", {"infill_density": density}) for density in (2, 4, 8, 16)],
+    "interpolate_airfoil_multiplier": [(f"interpolate_airfoil_multiplier={multiplier}", {**FILE_EXTRACTION, "interpolate": True, "interpolate_airfoil_multiplier": multiplier}) for multiplier in (1, 2, 4, 8)],
+    "airfoil": [("naca", {}), ("file_extraction", FILE_EXTRACTION)],
+    "circles": [("circles=off", {}), ("circles=on", {"generate_circle": True})],
+    "filled_layers": [("filled_layers=off", {}), ("filled_layers=on", {"filled_layers_enabled": True})],
+}
+
+QUICK_SWEEPS = {
+    "height": [(f"height={height}", {"z_positions": [0, height]}) for height in (5, 10, 20)],
+    "num_points": [(f"num_points={points}", {"num_points": points}) for points in (64, 256)],
+    "infill_density": [(f"infill_density={density}", {"infill_density": density}) for density in (4, 16)],
+    "airfoil": [("naca", {}), ("file_extraction", FILE_EXTRACTION)],
+    "circles": [("circles=on", {"generate_circle": True})],
+    "filled_layers": [("filled_layers=on", {"filled_layers_enabled": True})],
+}
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_case(settings, gcode=True):
+    # Generate one wing in this process and return its measurements
+    from config import WingConfig
+    from metrics import Metrics
+    from toolpath import PRINT, TRAVEL
+    from wing import wing_toolpaths
+
+    config = WingConfig(**{**BASELINE, **settings})
+    points = 0
+    layers = 0
+
+    def counted(toolpaths):
+        nonlocal points, layers
+        for toolpath in toolpaths:
+            points += int(((toolpath.move == PRINT) | (toolpath.move == TRAVEL)).sum())
+            layers += toolpath.num_layers
+            yield toolpath
+
+    with Metrics() as metrics:
+        start = time.perf_counter()
+        toolpaths = counted(wing_toolpaths(config, jobs=1))
+        if gcode:
+            import fullcontrol as fc
+            from gcode_stream import write_gcode
+            with tempfile.TemporaryDirectory() as directory:
+                write_gcode(toolpaths, fc.GcodeControls(save_as=os.path.join(directory, "benchmark"), include_date=False, initialization_data=config.printer_settings), show_tips=False)
+        else:
+            for _ in toolpaths:
+                pass
+        total = time.perf_counter() - start
+
+    stages = dict(metrics.stage_times)
+    stages["other"] = max(total - sum(stages.values()), 0.0)
+    return {"settings": settings, "total": total, "stages": stages, "peak_rss_mb": peak_rss_mb(), "points": points, "layers": layers}
+
+def run_case_in_subprocess(settings, gcode=True):
+    command = [sys.executable, os.path.abspath(__file__), "--case", json.dumps(settings)]
+    if not gcode:
+        command.append("--no-gcode")
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_sweeps(sweeps, gcode=True):
+    results = {}
+    for sweep, cases in sweeps.items():
+        for name, settings in cases:
+            result = run_case_in_subprocess(settings, gcode)
+            result["sweep"] = sweep
+            results[name] = result
+            stages = ", ".join(f"{stage} {seconds:.3f}" for stage, seconds in sorted(result["stages"].items()))
+            memory = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/a"
+            print(f"{name:36} {result['total']:8.3f} s {memory:>8} {result['points']:>10} points | {stages}")
+    return results
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def save_history(path, history):
+    with open(path, 'w') as file:
+        json.dump(history, file, indent=1)
+
+def compare(previous, current, threshold, min_seconds):
+    # Stages of the cases that got slower by more than threshold (a fraction) and min_seconds
+    regressions = []
+    for name, result in current["results"].items():
+        old = previous["results"].get(name)
+        if old is None:
+            continue
+        times = {**result["stages"], "total": result["total"]}
+        old_times = {**old["stages"], "total": old["total"]}
+        for stage, seconds in times.items():
+            old_seconds = old_times.get(stage)
+            if old_seconds is None:
+                continue
+            if seconds > old_seconds * (1 + threshold) and seconds - old_seconds > min_seconds:
+                regressions.append(f"{name}: {stage} {old_seconds:.3f} s -> {seconds:.3f} s")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the wing generation pipeline.")
+    parser.add_argument("--history", default="benchmark_history.json", help="JSON file the results are appended to (default: %(default)s)")
+    parser.add_argument("--quick", action="store_true", help="Run smaller sweeps")
+    parser.add_argument("--sweep", action="append", help="Only run this sweep. Can be given several times.")
+    parser.add_argument("--no-gcode", action="store_true", help="Don't include G-code writing in the measurements")
+    parser.add_argument("--compare", action="store_true", help="Fail if a stage is slower than in the previous run of the history")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown as a fraction for --compare (default: %(default)s)")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="Slowdowns smaller than this are ignored by --compare (default: %(default)s)")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case is not None:
+        # Run a single case, used by run_case_in_subprocess
+        print(json.dumps(run_case(json.loads(args.case), not args.no_gcode)))
+        return 0
+
+    sweeps = QUICK_SWEEPS if args.quick else SWEEPS
+    if args.sweep:
+        sweeps = {name: cases for name, cases in sweeps.items() if name in args.sweep}
+
+    run = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "gcode": not args.no_gcode,
+        "results": run_sweeps(sweeps, not args.no_gcode),
+    }
+
+    history = load_history(args.history)
+    history.append(run)
+    save_history(args.history, history)
+
+    if args.compare:
+        previous = next((old for old in reversed(history[:-1]) if old["gcode"] == run["gcode"]), None)
+        if previous is None:
+            print("Nothing to compare with yet")
+            return 0
+        regressions = compare(previous, run, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"Slower than the run of {previous['date']} ({previous['commit']}):")
+            for regression in regressions:
+                print("  " + regression)
+            return 1
+        print(f"No regressions compared to the run of {previous['date']} ({previous['commit']})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,62 +1,72 @@
-import fullcontrol as fc
+import functools
 import math
 import numpy as np
-
-def create_circle_segment(center, radius, num_points, start_theta, end_theta, z):
-    segment_points = np.linspace(start_theta, end_theta, num_points)
-    x = center.x + radius * np.cos(segment_points)
-    y = center.y + radius * np.sin(segment_points)
-    points = [fc.Point(x=x[i], y=y[i], z=z) for i in range(num_points)]
-    return points
+from toolpath import PRINT, TRAVEL
 
 def lerp(a, b, t):
     return a * (1 - t) + b * t
 
-def create_circles(circles, radius, offset, num_points, start_angle_deg, segment_angle_deg, current_z):
-    steps = []
-
-    # Convert segment angle and start angle to radians
+@functools.lru_cache(maxsize=None)
+def circle_table(num_points, start_angle_deg, segment_angle_deg):
+    # cos and sin of the angles of the points of every segment of a circle, as (segments, num_points) arrays.
+    # Only depends on the settings, so it is computed once and shared by every circle of every layer.
     segment_angle_rad = math.radians(segment_angle_deg)
     start_angle_rad = math.radians(start_angle_deg)
+    num_segments = int(2*math.pi / segment_angle_rad)
+    angles = np.empty((num_segments, num_points))
+    for i in range(num_segments):
+        segment_start_angle = start_angle_rad + i * segment_angle_rad
+        angles[i] = np.linspace(segment_start_angle, segment_start_angle + segment_angle_rad, num_points)
+    cos, sin = np.cos(angles), np.sin(angles)
+    cos.flags.writeable = False
+    sin.flags.writeable = False
+    return cos, sin
+
+def spar_value(value, k, t):
+    # Radius or offset of circle k: a number for every circle, or a list with a number or [start, end] for each circle.
+    # [start, end] is interpolated with t like the center.
+    if isinstance(value, (list, tuple)):
+        value = value[k]
+        if isinstance(value, (list, tuple)):
+            return lerp(value[0], value[1], t)
+    return np.full_like(t, value)
 
-    for circle in circles:
+def circle_layers(circles, radius, offset, num_points, start_angle_deg, segment_angle_deg, z_values):
+    # The circles of every layer at the heights z_values at once. Returns x, y and z as (layers, rows) arrays and
+    # the move of the rows, which is the same on every layer.
+    # Every circle is a travel to the start of its outer circle, then each segment of the outer and the inner circle.
+    z_values = np.asarray(z_values, dtype=np.float64)
+    if not circles:
+        empty = np.empty((len(z_values), 0))
+        return empty, empty, empty, np.empty(0, dtype=np.uint8)
+    cos, sin = circle_table(num_points, start_angle_deg, segment_angle_deg)
+    # (layers, circles) arrays of the center, z and the radius of the outer and the inner circle
+    center_x, center_y, center_z, outer_radius, inner_radius = (np.empty((len(z_values), len(circles))) for _ in range(5))
+    for k, circle in enumerate(circles):
         start_center = circle["start_center"]
         end_center = circle["end_center"]
 
-        # Calculate interpolation factor based on current_z
+        # Interpolation factor of every layer, based on its z
         z_range = end_center.z - start_center.z
-        if z_range != 0:
-            t = (current_z - start_center.z) / z_range
-        else:
-            t = 0
-
-        # Interpolate center position
-        center_x = lerp(start_center.x, end_center.x, t)
-        center_y = lerp(start_center.y, end_center.y, t)
-        center_z = lerp(start_center.z, end_center.z, t)
-        center = fc.Point(x=center_x, y=center_y, z=center_z)
-
-        outer_radius = radius
-        inner_radius = radius - offset
-
-        # Create segments for each circle
-        num_segments = int(2*math.pi / segment_angle_rad)
-        
-        # Travel to the start of the first segment
-        start_angle = start_angle_rad
-        x_start = center.x + outer_radius * np.cos(start_angle)
-        y_start = center.y + outer_radius * np.sin(start_angle)
-        steps.extend(fc.travel_to(fc.Point(x=x_start, y=y_start, z=center.z)))
-
-        for i in range(num_segments):
-            segment_start_angle = start_angle_rad + i * segment_angle_rad
-            segment_end_angle = segment_start_angle + segment_angle_rad
-
-            outer_segment = create_circle_segment(center, outer_radius, num_points, segment_start_angle, segment_end_angle, center_z)
-            inner_segment = create_circle_segment(center, inner_radius, num_points, segment_start_angle, segment_end_angle, center_z)
-
-            # Add segments to steps
-            steps.extend(outer_segment)
-            steps.extend(inner_segment)
-
-    return steps
\ No newline at end of file
+        t = (z_values - start_center.z) / z_range if z_range != 0 else np.zeros_like(z_values)
+
+        center_x[:, k] = lerp(start_center.x, end_center.x, t)
+        center_y[:, k] = lerp(start_center.y, end_center.y, t)
+        center_z[:, k] = lerp(start_center.z, end_center.z, t)
+        outer_radius[:, k] = spar_value(radius, k, t)
+        inner_radius[:, k] = outer_radius[:, k] - spar_value(offset, k, t)
+
+    # (layers, circles, segments, outer/inner, points)
+    radii = np.stack([outer_radius, inner_radius], axis=-1)[:, :, None, :, None]
+    x = center_x[:, :, None, None, None] + radii * cos[:, None, :]
+    y = center_y[:, :, None, None, None] + radii * sin[:, None, :]
+    shape = (len(z_values), len(circles), -1)
+
+    # The travel to the start of each circle comes before its points
+    x = np.concatenate([center_x[:, :, None] + outer_radius[:, :, None] * cos[0, 0], x.reshape(shape)], axis=2)
+    y = np.concatenate([center_y[:, :, None] + outer_radius[:, :, None] * sin[0, 0], y.reshape(shape)], axis=2)
+    z = np.broadcast_to(center_z[:, :, None], x.shape)
+    move = np.full(x.shape[1:], PRINT, dtype=np.uint8)
+    move[:, 0] = TRAVEL
+    layers = len(z_values)
+    return x.reshape(layers, -1), y.reshape(layers, -1), z.reshape(layers, -1), move.ravel()
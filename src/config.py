@@ -0,0 +1,105 @@
+import copy
+import json
+import os
+import types
+import fullcontrol as fc
+import parameters
+
+# Folder settings where None turns the feature off
+DISABLE_WITH_EMPTY = ("profile_cache_dir", "layer_cache_dir")
+
+def module_settings(module):
+    # Settings of a parameters module: every public value that isn't a module or a function
+    return {name: value for name, value in vars(module).items()
+            if not name.startswith('_') and not isinstance(value, types.ModuleType) and not callable(value)}
+
+def point_to_dict(point):
+    return {"x": point.x, "y": point.y, "z": point.z}
+
+def load_settings(path):
+    # Dict of the settings in a .json or .toml file
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path, 'r') as file:
+            return json.load(file)
+    if extension == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as file:
+            return tomllib.load(file)
+    raise ValueError(f"Unsupported config file type '{extension}'. Use a .json or .toml file.")
+
+class WingConfig:
+    """ All settings of a wing. Any setting that isn't given uses the value from parameters.py,
+    see the Parameters section of the README for what they do.
+
+    config = WingConfig(z_positions=[0, 50], chord_lengths=[80, 60])
+    config = WingConfig.from_file("wing.toml")
+    """
+    def __init__(self, **settings):
+        defaults = module_settings(parameters)
+        unknown = set(settings) - set(defaults)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}. See parameters.py for the available settings.")
+
+        values = copy.deepcopy(defaults)
+        values.update(copy.deepcopy(settings))
+
+        # Printer settings given as a partial dict are merged into the defaults. The extrusion width and height
+        # follow line_width and layer_height unless they are set explicitly, like in parameters.py.
+        printer_settings = dict(settings.get("printer_settings", {}))
+        values["printer_settings"] = {**defaults["printer_settings"], **printer_settings}
+        if "extrusion_width" not in printer_settings:
+            values["printer_settings"]["extrusion_width"] = values["line_width"]
+        if "extrusion_height" not in printer_settings:
+            values["printer_settings"]["extrusion_height"] = values["layer_height"]
+
+        # Circle centers can be given as dicts, for example when loaded from a file
+        values["circle_centers"] = [{name: center if isinstance(center, fc.Point) else fc.Point(**center) for name, center in circle.items()}
+                                    for circle in values["circle_centers"]]
+
+        # TOML has no null, so folders can also be turned off with "" or false
+        for name in DISABLE_WITH_EMPTY:
+            if values[name] == "" or values[name] is False:
+                values[name] = None
+
+        self.__dict__.update(values)
+        # Settings that were given explicitly, used by replace()
+        self._settings = copy.deepcopy(settings)
+
+    @classmethod
+    def from_module(cls, module):
+        # Config from a module with the same settings as parameters.py. The module computes the extrusion width and height
+        # from line_width and layer_height, so they are left out when they match and replace() computes them again.
+        settings = module_settings(module)
+        printer_settings = dict(settings.get("printer_settings", {}))
+        for name, source in (("extrusion_width", "line_width"), ("extrusion_height", "layer_height")):
+            if name in printer_settings and printer_settings[name] == settings.get(source):
+                del printer_settings[name]
+        if "printer_settings" in settings:
+            settings["printer_settings"] = printer_settings
+        return cls(**settings)
+
+    @classmethod
+    def from_dict(cls, settings):
+        return cls(**settings)
+
+    @classmethod
+    def from_file(cls, path):
+        # Load the settings from a .json or .toml file. Settings that aren't in the file use the defaults.
+        return cls.from_dict(load_settings(path))
+
+    def replace(self, **settings):
+        # Copy of the config with some settings changed
+        return WingConfig(**{**self._settings, **settings})
+
+    def to_dict(self):
+        # Plain dict of the settings that can be saved as JSON
+        values = {name: copy.deepcopy(value) for name, value in self.__dict__.items() if not name.startswith('_')}
+        values["circle_centers"] = [{name: point_to_dict(center) for name, center in circle.items()} for circle in values["circle_centers"]]
+        return values
+
+    def __repr__(self):
+        return f"WingConfig({json.dumps(self.to_dict())})"
@@ -0,0 +1,108 @@
+""" Estimates of a wing from its layer plan, without generating the whole wing.
+
+A few sample layers of every section are generated (the first, middle and last one, and every filled layer)
+and the rest are interpolated from them by chord. Arcs, travel ordering, calibration moves and the z-hop aren't included.
+"""
+import math
+import time
+import numpy as np
+from metrics import Metrics
+from plan import layer_plan
+from sections import section_layers
+from toolpath import PRINT, TRAVEL
+from wing import build_layer, section_contour
+
+def number_length(value):
+    # Length of a number as written in the G-code
+    return len(f'{value:.6f}'.rstrip('0').rstrip('.'))
+
+def measure_layer(config, row, filament_area):
+    # Extruded length, travel length, G-code lines and approximate G-code bytes of one layer
+    x, y, _ = section_layers(section_contour(config, row["section"]), row["chord"][None], row["shift"][None], row["z"][None])
+    layer = build_layer(config, x[0], y[0], row)
+    metrics = Metrics()
+    # The layer below ends about where this one ends, so the travel from it is counted from there
+    metrics.position = np.array([layer.x[-1], layer.y[-1], layer.z[-1] - config.layer_height])
+    metrics.count(layer)
+    counters = metrics.toolpaths[0]
+
+    moves = (layer.move == PRINT) | (layer.move == TRAVEL)
+    lengths = np.concatenate([[0.0], np.hypot(np.diff(layer.x), np.diff(layer.y))])[moves]
+    e_values = lengths * config.printer_settings["extrusion_width"] * config.printer_settings["extrusion_height"] / filament_area
+    # "G1 X.. Y.. E..", and F.. twice for every travel
+    gcode_bytes = sum(len("G1 X Y E\n") + number_length(x) + number_length(y) + number_length(e) for x, y, e in zip(layer.x[moves].tolist(), layer.y[moves].tolist(), e_values.tolist()))
+    gcode_bytes += (layer.move == TRAVEL).sum().item() * 2 * len("F2000 ")
+    return np.array([counters["extruded_length"], counters["travel_length"], moves.sum().item(), gcode_bytes], dtype=np.float64)
+
+def print_time(config, extruded_length, travel_length):
+    # Seconds to print and travel these lengths at the speeds of printer_settings, which are in mm/min.
+    # Acceleration isn't taken into account.
+    print_speed = config.printer_settings.get("print_speed", 1000)
+    travel_speed = config.printer_settings.get("travel_speed", 8000)
+    return 60 * (extruded_length / print_speed + travel_length / travel_speed)
+
+def sample_indices(plan):
+    # Rows of the plan that are generated: the first, middle and last layer that isn't filled in every section,
+    # and every filled layer
+    samples = [np.flatnonzero(plan["fill"])]
+    for section in np.unique(plan["section"]):
+        rows = np.flatnonzero((plan["section"] == section) & ~plan["fill"])
+        if len(rows):
+            samples.append(rows[[0, len(rows) // 2, -1]])
+    return np.unique(np.concatenate(samples)) if samples else np.zeros(0, dtype=np.int64)
+
+def estimate(config, plan=None):
+    # Estimates for the whole wing as a dict
+    plan = layer_plan(config) if plan is None else plan
+    filament_area = math.pi * (config.printer_settings.get("dia_feed", 1.75) / 2) ** 2
+    samples = sample_indices(plan)
+    measured = {index: measure_layer(config, plan[index], filament_area) for index in samples.tolist()}
+
+    totals = np.zeros(4)
+    for section in np.unique(plan["section"]):
+        rows = np.flatnonzero((plan["section"] == section) & ~plan["fill"])
+        sampled = [index for index in samples.tolist() if plan["section"][index] == section and not plan["fill"][index]]
+        if not len(rows):
+            continue
+        chords = plan["chord"][sampled]
+        values = np.array([measured[index] for index in sampled])
+        # Everything in a layer scales with the chord, the infill and fill about with its square
+        degree = min(2, len(np.unique(chords)) - 1)
+        for column in range(4):
+            if degree == 0:
+                totals[column] += values[:, column].mean() * len(rows)
+            else:
+                totals[column] += np.polyval(np.polyfit(chords, values[:, column], degree), plan["chord"][rows]).sum()
+    for index in np.flatnonzero(plan["fill"]).tolist():
+        totals += measured[index]
+
+    extruded_length, travel_length, lines, gcode_bytes = totals.tolist()
+    filament_volume = extruded_length * config.printer_settings["extrusion_width"] * config.printer_settings["extrusion_height"]
+    return {
+        "layers": len(plan),
+        "filled_layers": int(plan["fill"].sum()),
+        "sampled_layers": len(samples),
+        "extruded_length": extruded_length,
+        "travel_length": travel_length,
+        "filament_volume": filament_volume,
+        "filament_length": filament_volume / filament_area,
+        "print_time": print_time(config, extruded_length, travel_length),
+        "gcode_lines": int(lines),
+        "gcode_bytes": int(gcode_bytes),
+    }
+
+def print_plan(config):
+    start = time.time()
+    plan = layer_plan(config)
+    estimates = estimate(config, plan)
+    hours, minutes = divmod(round(estimates["print_time"] / 60), 60)
+    print(f"Layers: {estimates['layers']} in {len(config.z_positions) - 1} section(s), {estimates['filled_layers']} filled")
+    for section in range(len(config.z_positions) - 1):
+        rows = plan[plan["section"] == section]
+        if len(rows):
+            print(f"  Section {section + 1}: {len(rows)} layers, z {rows['z'][0]:.2f} to {rows['z'][-1]:.2f} mm, chord {rows['chord'][0]:.1f} to {rows['chord'][-1]:.1f} mm")
+    print(f"Extruded path: {estimates['extruded_length'] / 1000:.1f} m, travel: {estimates['travel_length'] / 1000:.2f} m")
+    print(f"Filament: {estimates['filament_length'] / 1000:.2f} m ({estimates['filament_volume'] / 1000:.1f} cm3)")
+    print(f"Print time: about {hours} h {minutes} min at the print and travel speeds of printer_settings")
+    print(f"G-code: about {estimates['gcode_lines']} lines, {estimates['gcode_bytes'] / 2**20:.1f} MB")
+    print(f"Estimated from {estimates['sampled_layers']} sample layers in {time.time() - start:.3f} s")
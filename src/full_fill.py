@@ -1,72 +1,106 @@
 import numpy as np
-import fullcontrol as fc
+from toolpath import Toolpath, PRINT, TRAVEL
 
-def rotate_point(point, angle, z):
-    """ Rotate a point counter-clockwise by a given angle around the origin (0,0).
+def rotate_points(x, y, angle):
+    """ Rotate points counter-clockwise by a given angle around the origin (0,0).
     """
     angle = np.radians(angle)  # Convert degrees to radians
-    px, py = point.x, point.y
-    qx = np.cos(angle)*px - np.sin(angle)*py
-    qy = np.sin(angle)*px + np.cos(angle)*py
-    return fc.Point(x=qx, y=qy, z=z)
+    qx = np.cos(angle)*x - np.sin(angle)*y
+    qy = np.sin(angle)*x + np.cos(angle)*y
+    return qx, qy
 
-def fill_shape(points, line_width, angle, z):
-    fill_points = []
+def scanline_intersections(x1, y1, x2, y2, y_values):
+    """ Intersections of the edges (x1, y1)-(x2, y2) with the horizontal scanlines y_values (sorted ascending).
+    Returns the scanline index and x of every intersection, sorted by scanline and then by x.
+    """
+    edge_min_y = np.minimum(y1, y2)
+    edge_max_y = np.maximum(y1, y2)
 
-    # Rotate points by given angle
-    rotated_points = [rotate_point(p, angle, z) if isinstance(p, fc.Point) else p for p in points]
+    # Edge table: every edge crosses the scanlines with edge_min_y < y <= edge_max_y, which is a contiguous range
+    first = np.searchsorted(y_values, edge_min_y, side='right')
+    last = np.searchsorted(y_values, edge_max_y, side='right')
+    counts = np.maximum(last - first, 0)
+
+    # One row per (edge, scanline) crossing
+    edges = np.repeat(np.arange(len(x1)), counts)
+    scanlines = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    y = y_values[scanlines]
+    x1, y1, x2, y2 = x1[edges], y1[edges], x2[edges], y2[edges]
+    x = x1 + (x2 - x1) * (y - y1) / (y2 - y1)
+
+    order = np.lexsort((x, scanlines))
+    return scanlines[order], x[order]
 
-    # Get the min and max y values of the rotated shape
-    min_y = min(point.y for point in rotated_points if isinstance(point, fc.Point))
-    max_y = max(point.y for point in rotated_points if isinstance(point, fc.Point))
+def scanline_segments(x1, y1, x2, y2, y_values):
+    """ Parts of the horizontal scanlines y_values (sorted ascending) that are inside the polygon made of the edges.
+    Inside is decided with the even-odd rule, so concave shapes and holes work.
+    Returns the scanline index, start x and end x of every part, sorted by scanline and then by x.
+    """
+    scanlines, intersections = scanline_intersections(x1, y1, x2, y2, y_values)
+
+    # Pair up the sorted intersections on each scanline. A lone last intersection is dropped.
+    starts = np.searchsorted(scanlines, np.arange(len(y_values)))
+    counts = np.bincount(scanlines, minlength=len(y_values))
+    rank = np.arange(len(scanlines)) - starts[scanlines]
+    pairs = np.flatnonzero((rank % 2 == 0) & (rank + 1 < counts[scanlines]))
+    return scanlines[pairs], intersections[pairs], intersections[pairs + 1]
+
+def serpentine(start_x, start_y, end_x, end_y):
+    """ Which lines to reverse so that every line starts at its end that is closer to where the previous line ended.
+    """
+    # Both possible previous end points are checked at once, then the choices are chained.
+    if len(start_x) < 2:
+        return np.zeros(len(start_x), dtype=bool)
+    def farther(px, py):
+        return np.sqrt((start_x[1:] - px)**2 + (start_y[1:] - py)**2) > np.sqrt((end_x[1:] - px)**2 + (end_y[1:] - py)**2)
+    swap_after_kept = np.concatenate([[False], farther(end_x[:-1], end_y[:-1])])
+    swap_after_swapped = np.concatenate([[False], farther(start_x[:-1], start_y[:-1])])
 
-    # For each y value between min_y and max_y with a step size of line_width
+    # A line whose choice is the same either way sets the chain to that choice, the first line is never swapped.
+    # Between those lines a line flips the previous choice if it is only swapped when the previous line isn't.
+    fixed = swap_after_kept == swap_after_swapped
+    flips = np.cumsum(swap_after_kept & ~swap_after_swapped)
+    last_fixed = np.maximum.accumulate(np.where(fixed, np.arange(len(start_x)), 0))
+    return swap_after_kept[last_fixed] ^ ((flips - flips[last_fixed]) % 2 == 1)
+
+def fill_edges(x1, y1, x2, y2, min_y, max_y, line_width, angle, z):
+    # Fill the polygon made of the given (rotated) edges with lines along the rotated x axis.
     y_values = np.arange(min_y, max_y + line_width, line_width)
+    scanlines, segment_start, segment_end = scanline_segments(x1, y1, x2, y2, y_values)
+
+    line_y = y_values[scanlines]
+    start_x, start_y = rotate_points(segment_start, line_y, -angle)
+    end_x, end_y = rotate_points(segment_end, line_y, -angle)
+
+    # Serpentine ordering: a line is reversed if its end is closer to where the previous line ended.
+    swapped = serpentine(start_x, start_y, end_x, end_y)
+    start_x, end_x = np.where(swapped, end_x, start_x), np.where(swapped, start_x, end_x)
+    start_y, end_y = np.where(swapped, end_y, start_y), np.where(swapped, start_y, end_y)
+
+    # Every line is a travel to its start followed by a printed move to its end
+    fill_x = np.column_stack([start_x, end_x]).ravel()
+    fill_y = np.column_stack([start_y, end_y]).ravel()
+    move = np.tile(np.array([TRAVEL, PRINT], dtype=np.uint8), len(scanlines))
+    return Toolpath(fill_x, fill_y, np.full(len(fill_x), z, dtype=np.float64), move)
+
+def fill_shape(shape, line_width, angle, z):
+    # shape is a toolpath. Neighbouring printed rows (and the last and the first row) form the edges of the polygon.
+    has_point = (shape.move == PRINT) | (shape.move == TRAVEL)
+    printed = shape.move == PRINT
+    edge_starts = np.flatnonzero(printed & np.roll(printed, -1))
+    edge_ends = (edge_starts + 1) % len(shape)
+
+    # Rotate points by given angle
+    rotated_x, rotated_y = rotate_points(shape.x, shape.y, angle)
+
+    return fill_edges(rotated_x[edge_starts], rotated_y[edge_starts], rotated_x[edge_ends], rotated_y[edge_ends],
+                      rotated_y[has_point].min(), rotated_y[has_point].max(), line_width, angle, z)
 
-    # Initialize the last point to None
-    last_point = None
-
-    # For each y value
-    for y in y_values:
-        intersections = []
-
-        # Check each line segment in the polygon for intersection with this y value
-        for i in range(len(rotated_points)):
-            p1 = rotated_points[i]
-            if not isinstance(p1, fc.Point):
-                continue
-            p2 = rotated_points[(i+1)%len(rotated_points)]
-            if not isinstance(p2, fc.Point):
-                continue
-
-            # If this line segment intersects with this y value
-            if min(p1.y, p2.y) < y <= max(p1.y, p2.y):
-                # Compute the x-coordinate of the intersection point
-                x = p1.x + (p2.x - p1.x) * (y - p1.y) / (p2.y - p1.y)
-                intersections.append(x)
-
-        # Sort the intersections to pair them up
-        intersections.sort()
-
-        # Generate the lines from these intersection points
-        for i in range(0, len(intersections) - 1, 2):
-            if i+1 < len(intersections):
-                line_start = rotate_point(fc.Point(x=intersections[i], y=y, z=z), -angle, z)
-                line_end = rotate_point(fc.Point(x=intersections[i+1], y=y, z=z), -angle, z)
-                
-                # Check if the line should start from the last end point
-                if last_point and np.linalg.norm(np.array([line_start.x, line_start.y]) - np.array([last_point.x, last_point.y])) > np.linalg.norm(np.array([line_end.x, line_end.y]) - np.array([last_point.x, last_point.y])):
-                    line_start, line_end = line_end, line_start
-
-                # Add the start and end points of the line to the fill_points list
-                fill_points.extend(fc.travel_to(line_start))  # use extend instead of append
-                fill_points.append(line_end)
-
-                # Update the last point
-                last_point = line_end
-
-    # Ensure the first point in fill_points is a fc.Point instance before calling fc.travel_to
-    if isinstance(fill_points[0], fc.Point):
-        fill_points.extend(fc.travel_to(fill_points[0]))
-
-    return fill_points
\ No newline at end of file
+def fill_loops(loops, line_width, angle, z):
+    # Fill an area bounded by closed loops given as (n, 2) arrays, for example an outline and cutouts inside it.
+    rotated = [np.column_stack(rotate_points(loop[:, 0], loop[:, 1], angle)) for loop in loops]
+    starts = np.concatenate(rotated)
+    ends = np.concatenate([np.roll(loop, -1, axis=0) for loop in rotated])
+    return fill_edges(starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1],
+                      starts[:, 1].min(), starts[:, 1].max(), line_width, angle, z)
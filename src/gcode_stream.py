@@ -0,0 +1,107 @@
+from datetime import datetime
+from fullcontrol.gcode.state import State
+from fullcontrol.gcode.tips import tips
+import fullcontrol as fc
+from metrics import stage
+from toolpath import FEATURES
+from arc_fitting import find_arcs
+
+class GcodeStream:
+    """ Writes G-code to a file one chunk of fullcontrol steps at a time, using the same gcode state
+    (extrusion, speeds, printer initialization) that fc.transform(steps, 'gcode', ...) would use for the whole list.
+    The written file is the same as the one fc.transform writes for all the chunks joined together.
+    """
+    def __init__(self, controls, show_tips=True):
+        self.controls = controls
+        self.show_tips = show_tips
+        self.state = None
+        self.file = None
+        self.filename = None
+        self.pending = []
+        self.ending_steps = []
+        self.last_line = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self.file is not None:
+            self.file.close()
+
+    def write(self, steps):
+        if self.state is None:
+            # The printer is initialized with the first point, so wait until there is one
+            self.pending.extend(steps)
+            if any(isinstance(step, fc.Point) for step in self.pending):
+                self.start(self.pending)
+                self.pending = []
+        else:
+            self.process(steps)
+
+    def start(self, steps):
+        self.controls.initialize()
+        if self.show_tips:
+            tips(self.controls)
+
+        # State adds the starting procedure and primer before the steps and the ending procedure after them.
+        # The ending procedure is held back until the stream is closed.
+        self.state = State(steps, self.controls)
+        last_step = steps[-1]
+        end = next(i for i in range(len(self.state.steps) - 1, -1, -1) if self.state.steps[i] is last_step) + 1
+        self.ending_steps = self.state.steps[end:]
+
+        self.filename = self.controls.save_as
+        self.filename += datetime.now().strftime("__%d-%m-%Y__%H-%M-%S.gcode") if self.controls.include_date == True else '.gcode'
+        self.file = open(self.filename, 'w')
+        self.process(self.state.steps[:end])
+
+    def process(self, steps):
+        state = self.state
+        state.steps = steps
+        state.i = 0
+        # The last line is kept until the next chunk because annotations can add text to the end of the previous line
+        state.gcode = [] if self.last_line is None else [self.last_line]
+        # need a while loop because some classes may change the length of state.steps
+        while state.i < len(state.steps):
+            gcode_line = state.steps[state.i].gcode(state)
+            if gcode_line != None:
+                state.gcode.append(gcode_line)
+            state.i += 1
+        if state.gcode:
+            lines = '\n'.join(state.gcode[:-1])
+            if lines:
+                self.file.write(lines + '\n')
+            self.last_line = state.gcode[-1]
+
+    def close(self):
+        if self.state is None:
+            if not self.pending:
+                return
+            self.start(self.pending)
+        self.process(self.ending_steps)
+        if self.last_line is not None:
+            self.file.write(self.last_line)
+        self.file.close()
+
+def write_gcode(toolpaths, controls, show_tips=True, arc_features=(), arc_tolerance=0.01):
+    # Stream an iterable of toolpaths (for example one per layer) to a G-code file. Returns the name of the file.
+    # Printed moves of the features in arc_features (names from toolpath.FEATURES) are written as G2/G3 arcs
+    # where they are within arc_tolerance (mm) of one.
+    unknown = set(arc_features) - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown arc_features: {', '.join(sorted(unknown))}. The options are {', '.join(FEATURES)}.")
+    features = [FEATURES[name] for name in arc_features]
+
+    with GcodeStream(controls, show_tips) as stream:
+        for toolpath in toolpaths:
+            arcs = None
+            if features:
+                with stage("arcs"):
+                    arcs = find_arcs(toolpath, features, arc_tolerance)
+            with stage("steps"):
+                steps = toolpath.to_steps(arcs)
+            with stage("gcode"):
+                stream.write(steps)
+    return stream.filename
@@ -1,60 +1,74 @@
-import fullcontrol as fc
-
-def find_closest(point, point_list, condition):
-    min_distance = float('inf')
-    closest_point = None
-
-    for p in point_list:
-        # Check if p has a 'z' attribute before trying to access it. Done because of fc.travel_to.
-        if hasattr(p, 'z') and p.z == point.z and ((condition and p.y > 0) or (not condition and p.y < 0)):
-            distance = abs(point.x - p.x)
-            if distance < min_distance:
-                min_distance = distance
-                closest_point = p
-
-    return closest_point
-
-def add_step(steps, added, z, condition, direction):
-    closest = find_closest(fc.Point(x=added, y=None, z=z), steps, condition)
-    if direction:
-        steps.append(closest if closest and closest.y <= 0 else fc.Point(x=added, y=0, z=z))
-    else:
-        steps.append(closest if closest and closest.y >= 0 else fc.Point(x=added, y=0, z=z))
-    return steps
+import numpy as np
+from toolpath import Toolpath
 
-def infill_modified_triangle_wave(steps, z, min_x, max_x, infill_density, infill_reverse, layer_height, infill_rise):
-    s_density = max_x / infill_density
+class SurfaceIndex:
+    # Upper (y > 0) and lower (y < 0) surface of a contour as x-sorted arrays for bisection lookups
+    def __init__(self, x, y):
+        self.x = x
+        self.surfaces = {True: self.sort_by_x(np.flatnonzero(y > 0)), False: self.sort_by_x(np.flatnonzero(y < 0))}
 
-    if infill_reverse:
-        for i in range(infill_density - 1, 0, -1):
-            added = s_density * i
-            condition = (i+1) % 2 == 0  # Shift condition for second half to meet the first half at y=0.
-            steps = add_step(steps, added, z, condition, False)
+    def sort_by_x(self, indices):
+        # Stable sort so that points with equal x stay in contour order
+        order = np.argsort(self.x[indices], kind='stable')
+        return indices[order], self.x[indices][order]
 
-        steps.append(fc.Point(x=min_x, y=0, z=z))
+    def closest(self, added, upper):
+        # Index of the contour point closest in x to each value of added on the upper or lower surface, -1 if there are none.
+        # If several points are as close, the one that comes first in the contour is chosen.
+        indices, sorted_x = self.surfaces[upper]
+        if len(indices) == 0:
+            return np.full(len(added), -1)
+        positions = np.searchsorted(sorted_x, added)
+        left = np.maximum(positions - 1, 0)
+        right = np.minimum(positions, len(sorted_x) - 1)
+        left_distance = np.abs(added - sorted_x[left])
+        right_distance = np.abs(added - sorted_x[right])
+        distance = np.minimum(left_distance, right_distance)
 
-        for i in range(1, infill_density):
-            added = s_density * i
-            condition = i % 2 == 0  # Maintain original condition for first half
-            steps = add_step(steps, added, z, condition, True)
+        # Points that are exactly as close have the x of the left or the right neighbour. Points with the same x are
+        # in contour order, so the first one of each x is the one that comes first in the contour.
+        none = len(self.x)
+        from_left = np.where(left_distance == distance, indices[np.searchsorted(sorted_x, sorted_x[left])], none)
+        from_right = np.where(right_distance == distance, indices[np.searchsorted(sorted_x, sorted_x[right])], none)
+        return np.minimum(from_left, from_right)
+
+def infill_vertices(x, y, added, closest, direction):
+    # Use the closest contour point where it's on the right side of y=0, otherwise a point at y=0
+    found = closest >= 0
+    closest_x = x[np.where(found, closest, 0)]
+    closest_y = y[np.where(found, closest, 0)]
+    use_closest = found & ((closest_y <= 0) if direction else (closest_y >= 0))
+    vertex_x = np.where(use_closest, closest_x, added)
+    vertex_y = np.where(use_closest, closest_y, 0)
+    return np.column_stack([vertex_x, vertex_y])
+
+def infill_modified_triangle_wave(x, y, z, min_x, max_x, infill_density, infill_reverse, layer_height, infill_rise):
+    # x and y are the contour of the layer. Returns the infill as a toolpath.
+    s_density = max_x / infill_density
 
-        steps.append(fc.Point(x=max_x, y=0, z=z))
+    # Closest points on both surfaces for every infill position, found in one batch
+    i = np.arange(1, infill_density)
+    added = s_density * i
+    index = SurfaceIndex(x, y)
+    closest_upper = index.closest(added, True)
+    closest_lower = index.closest(added, False)
+
+    # First half goes up in x with the original condition, the second half comes back with the condition shifted
+    # to meet the first half at y=0.
+    condition = i % 2 == 0
+    first_half = infill_vertices(x, y, added, np.where(condition, closest_upper, closest_lower), True)
+    second_half = infill_vertices(x, y, added, np.where(~condition, closest_upper, closest_lower), False)[::-1]
+
+    if infill_reverse:
+        steps = [second_half, [(min_x, 0)], first_half, [(max_x, 0)]]
     else:
-        for i in range(1, infill_density):
-            added = s_density * i
-            condition = i % 2 == 0  # Maintain original condition for first half
-            steps = add_step(steps, added, z, condition, True)
-            
-        steps.append(fc.Point(x=max_x, y=0, z=z))
-            
-        for i in range(infill_density - 1, 0, -1):
-            added = s_density * i
-            condition = (i+1) % 2 == 0  # Shift condition for second half to meet the first half at y=0.
-            steps = add_step(steps, added, z, condition, False)
+        steps = [first_half, [(max_x, 0)], second_half]
+    steps.append([(min_x, 0)])
+
+    infill = np.concatenate([np.asarray(step, dtype=np.float64).reshape(-1, 2) for step in steps])
+    infill_z = np.full(len(infill), z, dtype=np.float64)
 
     if infill_rise:
-        steps.append(fc.Point(x=min_x, y=0, z=z+layer_height/2))
-    else:
-        steps.append(fc.Point(x=min_x, y=0, z=z))
+        infill_z[-1] = z + layer_height/2
 
-    return steps
+    return Toolpath(infill[:, 0], infill[:, 1], infill_z)
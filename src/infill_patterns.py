@@ -0,0 +1,120 @@
+""" Infill patterns, selected with infill_type.
+
+A pattern is a function that gets the contour x and y of a layer, its z and the config, and returns the infill
+as a toolpath. New patterns are added with the infill_pattern decorator:
+
+    @infill_pattern('my_pattern')
+    def my_pattern(x, y, z, config):
+        ...
+
+The rectilinear, grid and gyroid patterns are made of lines that are clipped against the contour all at once
+with the scanline clipping of full_fill, so their cost grows with the number of lines and not with the number
+of contour points times the density.
+"""
+import numpy as np
+from full_fill import rotate_points, scanline_segments, serpentine
+from infill_modified_triangle_wave import infill_modified_triangle_wave
+from plan import layer_number
+from toolpath import Toolpath, PRINT, TRAVEL
+
+# Infill patterns by name
+INFILL_PATTERNS = {}
+
+# Points per wavelength of the gyroid waves
+WAVE_SAMPLES = 16
+
+def infill_pattern(name):
+    # Decorator that adds a pattern to INFILL_PATTERNS
+    def register(function):
+        INFILL_PATTERNS[name] = function
+        return function
+    return register
+
+def layer_infill(config, x, y, z):
+    # Infill of the layer with contour x, y at height z, in the pattern set by infill_type
+    if config.infill_type not in INFILL_PATTERNS:
+        raise ValueError(f"Unknown infill_type '{config.infill_type}'. The options are: {', '.join(INFILL_PATTERNS)}.")
+    return INFILL_PATTERNS[config.infill_type](x, y, z, config)
+
+def scanline_values(min_y, max_y, spacing):
+    # Scanlines at multiples of spacing, so the lines are at the same place on every layer with the same angle
+    return np.arange(np.ceil(min_y / spacing), np.floor(max_y / spacing) + 1) * spacing
+
+def clip_lines(x, y, spacing, wave=None):
+    # Parts of the lines at multiples of spacing along the x axis that are inside the closed contour x, y.
+    # wave(x) shifts the lines in y, the contour is shifted the opposite way so the lines can be clipped as straight lines.
+    # Returns the y of the line, start x and end x of every part.
+    if wave is not None:
+        y = y - wave(x)
+    y_values = scanline_values(y.min(), y.max(), spacing)
+    lines, start, end = scanline_segments(x, y, np.roll(x, -1), np.roll(y, -1), y_values)
+    return y_values[lines], start, end
+
+def line_toolpath(line_x, line_y, counts, angle, z):
+    # Toolpath of lines given as points in the rotated frame, counts points per line. Each line is started with a travel,
+    # from the end that is closer to where the previous line ended.
+    line_x, line_y = rotate_points(line_x, line_y, -angle)
+    first = np.cumsum(counts) - counts
+    last = first + counts - 1
+    swapped = serpentine(line_x[first], line_y[first], line_x[last], line_y[last])
+
+    line = np.repeat(np.arange(len(counts)), counts)
+    rank = np.arange(counts.sum()) - first[line]
+    rows = np.where(swapped[line], last[line] - rank, first[line] + rank)
+    move = np.where(rank == 0, TRAVEL, PRINT).astype(np.uint8)
+    return Toolpath(line_x[rows], line_y[rows], np.full(len(rows), z, dtype=np.float64), move)
+
+def straight_lines(x, y, z, spacing, angle):
+    rotated_x, rotated_y = rotate_points(x, y, angle)
+    line_y, start, end = clip_lines(rotated_x, rotated_y, spacing)
+    return line_toolpath(np.column_stack([start, end]).ravel(), np.repeat(line_y, 2), np.full(len(line_y), 2), angle, z)
+
+def subdivide(x, y, max_length):
+    # Closed contour with points added so no edge is longer than max_length in x
+    dx = np.roll(x, -1) - x
+    dy = np.roll(y, -1) - y
+    pieces = np.maximum(np.ceil(np.abs(dx) / max_length), 1).astype(np.intp)
+    edge = np.repeat(np.arange(len(x)), pieces)
+    t = (np.arange(pieces.sum()) - np.repeat(np.cumsum(pieces) - pieces, pieces)) / pieces[edge]
+    return x[edge] + dx[edge] * t, y[edge] + dy[edge] * t
+
+def wave_lines(x, y, z, spacing, angle, amplitude, wavelength, phase):
+    # Sine waves along the rotated x axis, spacing apart, clipped to the contour
+    def wave(u):
+        return amplitude * np.sin(2 * np.pi * u / wavelength + phase)
+    step = wavelength / WAVE_SAMPLES
+    rotated_x, rotated_y = subdivide(*rotate_points(x, y, angle), step)
+    line_y, start, end = clip_lines(rotated_x, rotated_y, spacing, wave)
+
+    # The points of a line are its ends and the multiples of step between them
+    first = np.floor(start / step) + 1
+    counts = np.maximum(np.ceil(end / step) - first, 0).astype(np.intp) + 2
+    line = np.repeat(np.arange(len(counts)), counts)
+    rank = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    u = np.where(rank == 0, start[line], np.minimum((first[line] + rank - 1) * step, end[line]))
+    u[np.cumsum(counts) - 1] = end
+    return line_toolpath(u, line_y[line] + wave(u), counts, angle, z)
+
+@infill_pattern('modified_triangle_wave')
+def modified_triangle_wave(x, y, z, config):
+    return infill_modified_triangle_wave(x, y, z, x.min().item(), x.max().item(), config.infill_density, config.infill_reverse, config.layer_height, config.infill_rise)
+
+@infill_pattern('rectilinear')
+def rectilinear(x, y, z, config):
+    # Parallel lines, turned 90 degrees on every other layer
+    angle = config.infill_angle + 90 * (layer_number(z, config.layer_height).item() % 2)
+    return straight_lines(x, y, z, config.infill_spacing, angle)
+
+@infill_pattern('grid')
+def grid(x, y, z, config):
+    # Lines in both directions on every layer
+    return Toolpath.concat([straight_lines(x, y, z, config.infill_spacing, config.infill_angle),
+                            straight_lines(x, y, z, config.infill_spacing, config.infill_angle + 90)])
+
+@infill_pattern('gyroid')
+def gyroid(x, y, z, config):
+    # Approximation of a gyroid: sine waves that move along the lines by as much as z goes up, so the walls
+    # lean 45 degrees, and turn 90 degrees every half wavelength of z
+    wavelength = 2 * config.infill_spacing
+    angle = config.infill_angle + 90 * (int(np.floor(2 * z / wavelength)) % 2)
+    return wave_lines(x, y, z, config.infill_spacing, angle, 0.4 * config.infill_spacing, wavelength, 2 * np.pi * z / wavelength)
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import zipfile
+import numpy as np
+from toolpath import Toolpath
+
+# Change when the generation of a layer changes, so layers cached by an older version aren't used
+CACHE_VERSION = 4
+
+def layer_key(*inputs):
+    # Hash of everything that cached layers depend on. Floats are hashed by their repr, which is exact.
+    return hashlib.blake2b(repr((CACHE_VERSION,) + inputs).encode(), digest_size=20).hexdigest()
+
+def array_digest(array):
+    return hashlib.blake2b(np.ascontiguousarray(array).tobytes(), digest_size=16).hexdigest()
+
+class LayerCache:
+    """ On-disk cache of generated layers. Each .npz file has a range of layers (a chunk of layer_chunk_size layers) and is
+    named by the hash of the inputs of those layers.
+    When the files take more than max_bytes the least recently used ones are deleted.
+    Several processes can use the same directory: files are written atomically and missing files are misses.
+    A file that can't be read or written is a miss too, so a broken cache only makes the wing generate slower.
+    """
+    def __init__(self, cache_dir, max_bytes):
+        if not cache_dir:
+            raise ValueError("The layer cache needs a folder. Use None to not cache the layers.")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.size = None
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".npz")
+
+    def load(self, key):
+        # The cached layers, or None
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                toolpath = Toolpath(data["x"], data["y"], data["z"], data["move"], data["layer_offsets"], data["feature"])
+            # The modification time is the last use, for the LRU eviction
+            os.utime(path)
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            return None
+        return toolpath
+
+    def save(self, key, toolpath):
+        path = self.path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'wb') as file:
+                np.savez(file, x=toolpath.x, y=toolpath.y, z=toolpath.z, move=toolpath.move, feature=toolpath.feature, layer_offsets=toolpath.layer_offsets)
+            new_size = os.path.getsize(temp_path)
+            # A file that is replaced no longer counts for the size
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.files())
+        else:
+            self.size += new_size - old_size
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def files(self):
+        # (path, size, last use) of every cache file
+        files = []
+        if not os.path.isdir(self.cache_dir):
+            return files
+        for directory in os.scandir(self.cache_dir):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                if entry.name.endswith(".npz"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:  # Deleted by another process
+                        continue
+                    files.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        return files
+
+    def evict(self):
+        # Delete the least recently used files until the cache is below 90% of its size,
+        # so it isn't scanned again for every new file
+        files = sorted(self.files(), key=lambda file: file[2])
+        size = sum(size for _, size, _ in files)
+        for path, file_size, _ in files:
+            if size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= file_size
+        self.size = size
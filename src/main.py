@@ -1,228 +1,150 @@
+import argparse
 import time
 start = time.time()
-import numpy as np
-import fullcontrol as fc
-from infill_modified_triangle_wave import infill_modified_triangle_wave
-from circle_utils import create_circles
-from full_fill import fill_shape
-from parameters import *
-
-def calibration(bed_x_max, bed_y_max):
-    calibration = []
-    calibration.append(fc.Extruder(on=False))
-    calibration.append(fc.Point(x=bed_x_max, y=bed_y_max, z=10))
-    calibration.append(fc.Point(x=0, y=0, z=10))
-    calibration.append(fc.Extruder(on=True))
-    return calibration
-
-def naca_airfoil(naca_num, num_points, chord_length):
-    naca_length = len(naca_num)
-    if naca_length != 4 and naca_length != 3:
-        raise ValueError("Invalid NACA number. Must be 4 or 3 digits long. See: https://en.m.wikipedia.org/wiki/NACA_airfoil#Four-digit_series for formatting.")
-    m = int(naca_num[0]) / 100
-    p = int(naca_num[1]) / 10
-    t = int(naca_num[2:]) / 100
-    x = np.linspace(0, 1, num_points)
-    y_t = 5 * t * (0.2969 * np.sqrt(x) - 0.126 * x - 0.3516 * x**2 + 0.2843 * x**3 - 0.1015 * x**4)
-    if p == 0:
-        yc = np.zeros_like(x)
+import parameters
+from config import WingConfig
+from metrics import Metrics, stage
+from travel_order import TravelOptimizer
+from wing import count_layers, contour_point_counts, wing_toolpaths
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a 3D printable wing. By default the wing is set up in parameters.py.")
+    parser.add_argument("--config", help="Load the settings from a .json or .toml file instead of parameters.py. Settings missing from the file use the values in parameters.py.")
+    parser.add_argument("--jobs", type=int, help="Number of processes used to generate the layers")
+    parser.add_argument("--gcode", metavar="NAME", help="Generate G-code and save it with this name")
+    parser.add_argument("--no-plot", action="store_true", help="Don't render the plot")
+    parser.add_argument("--preview-step", type=int, metavar="N", help="Only plot every Nth layer")
+    parser.add_argument("--preview-points", type=int, metavar="N", help="Plot at most about N printed points per layer")
+    parser.add_argument("--preview-key-layers", action="store_true", help="Only plot the first, last and filled layers")
+    parser.add_argument("--preview-export", metavar="PATH", help="Save the plotted toolpaths to this line buffer file for other viewers")
+    parser.add_argument("--save-toolpath", metavar="PATH", help="Save the generated toolpath to this .npz file")
+    parser.add_argument("--load-toolpath", metavar="PATH", help="Don't generate the wing, use the toolpath saved in this file with --save-toolpath")
+    parser.add_argument("--plan", action="store_true", help="Only print the layer plan and estimates of the print time, filament and G-code size")
+    parser.add_argument("--metrics", metavar="REPORT", help="Print a summary of the stage times and counters and save them to this JSON file")
+    parser.add_argument("--profile-cpu", action="store_true", help="Also profile the generation with cProfile")
+    parser.add_argument("--profile-memory", action="store_true", help="Also trace memory allocations with tracemalloc")
+    return parser.parse_args(argv)
+
+def run(config, jobs=None, toolpath_path=None):
+    # Generate the wing and write the outputs that are enabled in config.
+    # With toolpath_path the toolpaths are loaded from that toolpath file instead of generated.
+    optimizer = None
+    if toolpath_path:
+        from toolpath_file import load_toolpath, toolpath_pieces
+        toolpath, metadata = load_toolpath(toolpath_path)
+        print(f"Loaded {metadata['layers']} layers from {toolpath_path} (saved {metadata['created']})")
+        toolpaths = toolpath_pieces(toolpath)
     else:
-        yc = np.where(x < p, m / p**2 * (2 * p * x - x**2), m / (1 - p)**2 * ((1 - 2 * p) + 2 * p * x - x**2))
-    theta = np.arctan(np.gradient(yc, x))
-    xu = x - y_t * np.sin(theta)
-    xl = x + y_t * np.sin(theta)
-    yu = yc + y_t * np.cos(theta)
-    yl = yc - y_t * np.cos(theta)
-    xu *= chord_length
-    yu *= chord_length
-    xl *= chord_length
-    yl *= chord_length
-    steps_upper = [fc.Point(x=xu[i], y=yu[i], z=0) for i in range(num_points)]
-    steps_lower = [fc.Point(x=xl[i], y=yl[i], z=0) for i in range(num_points - 1, -1, -1)]
-    steps = steps_upper + steps_lower
-    return steps
-
-def airfoil_extract(chord_length, filename):
-    airfoil = []
-    with open("profiles/" + filename, 'r') as file:
-        lines = file.readlines()
-    for line in lines[1:]:
-        x, y = map(float, line.split())
-        airfoil.append(fc.Point(x=x * chord_length, y=y * chord_length, z=0))
-    if interpolate:
-        airfoil = optimize_airfoil(airfoil)
-    if sort_point_order:
-        airfoil = sort_points(airfoil, reverse_points_sorting)
-    return airfoil
-
-def optimize_airfoil(airfoil):
-    new_points = []
-    for i in range(len(airfoil) - 1):
-        point1 = airfoil[i]
-        point2 = airfoil[i + 1]
-
-        avg_values = [(val1 + val2) / 2 for val1, val2 in zip((point1.x, point1.y, point1.z), (point2.x, point2.y, point2.z))]
-        new_point = fc.Point(x=avg_values[0], y=avg_values[1], z=avg_values[2])
-
-        new_points.append(point1)
-        new_points.extend([new_point]*interpolate_airfoil_multiplier)
-
-    new_points.append(airfoil[-1])
-    return new_points
-
-def remove_points_y0(airfoil):
-    airfoil = [point for point in airfoil if point.y != 0]
-    return airfoil
-
-def sort_points(points, reverse_order):
-    points_over_y0 = []
-    points_under_y0 = []
-
-    for point in points:
-        (points_over_y0 if point.y > 0 else points_under_y0).append(point)
-
-    points_over_y0.sort(key=lambda point: point.x, reverse=reverse_order)
-    points_under_y0.sort(key=lambda point: point.x, reverse=not reverse_order)
-
-    return points_over_y0 + points_under_y0
-
-def airfoil_wrapper(naca_nums, num_points, z_values, chord_lengths, naca_airfoil_generation, filenames):
-    
-    airfoils = []
-    
-    def process_airfoil(airfoil, z_value):
-        return [fc.Point(x=point.x, y=point.y, z=z_value) for point in airfoil]
-    
-    if naca_airfoil_generation:
-        for z_value, chord_length, filename in zip(z_values, chord_lengths, filenames):
-            airfoil = airfoil_extract(chord_length, filename)
-            airfoil = process_airfoil(airfoil, z_value)
-            airfoils.append(airfoil)
+        if config.print_total_layers:
+            print(f"Total layers: {count_layers(config)}")
+
+        if config.print_contour_points:
+            counts = contour_point_counts(config)
+            if any(before != after for before, after in counts):
+                for i, (before, after) in enumerate(counts):
+                    print(f"Section {i + 1} contour points: {before} -> {after} ({100 * (before - after) / before:.0f}% fewer)")
+
+        optimizer = TravelOptimizer() if config.optimize_travel else None
+        toolpaths = wing_toolpaths(config, jobs, optimizer)
+
+    writer = None
+    if config.save_toolpath:
+        from toolpath_file import ToolpathWriter
+        writer = ToolpathWriter(config.save_toolpath, config)
+        toolpaths = writer.collect(toolpaths)
+
+    preview = None
+    if config.print_rendering_plot or config.preview_export:
+        # The plot needs the whole wing at once, so the layers of the preview are kept in memory.
+        # Without preview settings that is every layer.
+        from preview import Preview
+        preview = Preview.from_config(config)
+        toolpaths = preview.collect(toolpaths)
+
+    if not config.gcode_generation and (preview is not None or writer is not None):
+        # Nothing else goes through the toolpaths, so they are generated here
+        for _ in toolpaths:
+            pass
+
+    if config.gcode_generation:
+        import fullcontrol as fc
+        from gcode_stream import write_gcode
+        if config.print_generating_gcode:
+            print("Generating gcode")
+        # Each layer is written to the file as soon as it has been generated
+        write_gcode(toolpaths, fc.GcodeControls(save_as=config.gcode_name, initialization_data=config.printer_settings), arc_features=config.arc_features, arc_tolerance=config.arc_tolerance)
+
+    if writer is not None:
+        writer.close()
+        print(f"Toolpath saved to {config.save_toolpath}")
+
+    if config.preview_export:
+        from preview import write_line_buffer
+        with stage("preview"):
+            vertices = write_line_buffer(preview.toolpaths(), config.preview_export)
+        print(f"Preview with {vertices} vertices saved to {config.preview_export}")
+
+    if config.print_rendering_plot:
+        print("Rendering plot")
+        # The plotting stack is only imported when a plot is requested
+        with stage("plot"):
+            from plotting import plot_toolpaths
+            plot_toolpaths(preview.toolpaths(), config)
+
+    if config.print_rendering_plot_done:
+        print("Rendering done")
+
+    if optimizer is not None and config.print_travel_saved and optimizer.travel_before > 0:
+        saved = optimizer.travel_before - optimizer.travel_after
+        print(f"Travel: {optimizer.travel_before:.0f} mm -> {optimizer.travel_after:.0f} mm ({100 * saved / optimizer.travel_before:.0f}% less)")
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = WingConfig.from_file(args.config) if args.config else WingConfig.from_module(parameters)
+
+    settings = {}
+    if args.gcode:
+        settings.update(gcode_generation=True, gcode_name=args.gcode)
+    if args.no_plot:
+        settings.update(print_rendering_plot=False)
+    if args.preview_step:
+        settings.update(preview_layer_step=args.preview_step)
+    if args.preview_points:
+        settings.update(preview_max_points=args.preview_points)
+    if args.preview_key_layers:
+        settings.update(preview_key_layers=True)
+    if args.preview_export:
+        settings.update(preview_export=args.preview_export)
+    if args.save_toolpath:
+        settings.update(save_toolpath=args.save_toolpath)
+    if args.metrics:
+        settings.update(print_metrics=True, metrics_report=args.metrics)
+    if args.profile_cpu:
+        settings.update(profile_cpu=True)
+    if args.profile_memory:
+        settings.update(profile_memory=True)
+    if settings:
+        config = config.replace(**settings)
+
+    if args.plan:
+        from estimate import print_plan
+        print_plan(config)
+        return
+
+    if config.print_metrics or config.metrics_report:
+        with Metrics(config.profile_cpu, config.profile_memory) as metrics:
+            run(config, args.jobs, args.load_toolpath)
+        if config.print_metrics:
+            print(metrics.summary())
+        if config.metrics_report:
+            metrics.write_report(config.metrics_report)
     else:
-        for naca_num, z_value, chord_length in zip(naca_nums, z_values, chord_lengths):
-            airfoil = naca_airfoil(naca_num, num_points, chord_length)
-            airfoil = process_airfoil(airfoil, z_value)
-            airfoils.append(airfoil)
-
-    return airfoils
-
-def lerp_points(p1, p2, t):
-    x = p1.x * (1 - t) + p2.x * t
-    y = p1.y * (1 - t) + p2.y * t
-    z = p1.z * (1 - t) + p2.z * t
-    return fc.Point(x=x, y=y, z=z)
-
-def loft_shapes():    
-    assert len(naca_nums) == len(z_positions) == len(chord_lengths) == len(filenames), "Input lists must have the same length. There is a bug in the code or you have inputted different length lists."
-
-    steps = []
-    
-    total_layers = sum(int((z_positions[i+1] - z_positions[i]) / layer_height) for i in range(len(z_positions) - 1))
-    if print_total_layers:
-        print(f"Total layers: {total_layers}")
-
-    for i in range(len(z_positions) - 1):
-        num_layers = int((z_positions[i+1] - z_positions[i]) / layer_height)
-        current_z = z_positions[i]
-        
-        chord_length_diff = chord_lengths[i+1] - chord_lengths[i]
-
-        for j in range(num_layers):
-            z = current_z + j * layer_height
-            
-            # Normalized height within current segment
-            t = j / num_layers
-                       
-            # Interpolate chord length
-            if curved_wing:
-                # Quadratic interpolation
-                chord_length = chord_lengths[i] + chord_length_diff * (t**2) * curve_amount
-            else:
-                # Linear interpolation
-                chord_length = chord_lengths[i] + chord_length_diff * t 
-                
-            airfoil = airfoil_wrapper([naca_nums[i]], num_points, [z], [chord_length], file_extraction, [filenames[i]])[0]
-                                                           
-            # Move airfoil based on chord lengths if edge is not set as straight
-            # Calculating these in a different way leads to a weird bug where the infill spills out.
-            # For now this method works.
-	    # Also has a bug that makes moving imported airfoils impossible.
-            if move_trailing_edge:
-                if move_leading_edge:
-                    delta_x = (chord_lengths[i] - chord_length) / 2
-                    for point in airfoil:
-                        point.x += delta_x
-                else:
-                    pass
-            elif move_leading_edge:
-                delta_x = (chord_lengths[i] - chord_length)
-                for point in airfoil:
-                    point.x += delta_x
-            else:
-                delta_x = (chord_lengths[i] - chord_length) / 2
-                for point in airfoil:
-                    point.x += delta_x
-                      
-            layer = airfoil
-
-            min_x = min(point.x for point in airfoil)
-
-            if generate_infill and not z in filled_layers:
-                max_x = max(point.x for point in airfoil)
-                if infill_type == infill_modified_triangle_wave:
-                    layer.extend(infill_modified_triangle_wave(layer, z, min_x, max_x, infill_density, infill_reverse, layer_height, infill_rise))            
-            
-            if generate_circle and not z in filled_layers:
-                layer.extend(create_circles(circle_centers, circle_radius, circle_offset, circle_num_points, circle_start_angle, circle_segment_angle, z))
-
-            # Validate z to ensure it's a multiple of layer_height, if not round to the nearest multiple. Used for the fill_layer
-            remainder = z % layer_height
-            if remainder != 0:
-                if remainder >= layer_height / 2:
-                    z += layer_height - remainder
-                else:
-                    z -= remainder
-                    
-            # Check if this z-value should be a fully filled layer
-            if filled_layers_enabled and z in filled_layers:
-                layer.extend(fill_shape(airfoil, line_width, fill_angle, z))
-
-            # After completing the layer, move to next layer using fc.travel_to.
-            steps.extend(fc.travel_to(fc.Point(x=min_x, y=0, z=z+layer_height)))
-            
-            steps.extend(layer)
-    
-    return steps
-
-steps = loft_shapes()
-
-if offset_wing:
-    steps = fc.move(steps, fc.Vector(x=offset_x, y=offset_y, z=offset_z))
-
-if calibration_moves:
-    calibration = calibration(bed_x_max, bed_y_max)
-    steps = calibration+steps
-
-if z_hop_enabled:
-    steps.append(fc.Extruder(on=False))
-    steps.append(fc.Point(z=+z_hop_amount))
-
-if gcode_generation:
-    if print_generating_gcode:
-        print("Generating gcode")
-    fc.transform(steps, 'gcode', fc.GcodeControls(save_as=gcode_name, initialization_data=printer_settings))
-
-if print_rendering_plot:
-    print("Rendering plot")
-    if plot_neat_for_publishing:
-        fc.transform(steps, 'plot', fc.PlotControls(color_type='print_sequence', style=plot_style, neat_for_publishing = True, zoom = 0.8, hide_travel=True, line_width=10))
-    else: 
-        fc.transform(steps, 'plot', fc.PlotControls(color_type='print_sequence', style=plot_style))
-
-if print_rendering_plot_done:
-    print("Rendering done")
-
-if print_time_taken:
-    end = time.time()
-    time_to_generate = end-start
-    print('Generated in: '+str(round(time_to_generate, 3))+' s')
+        run(config, args.jobs, args.load_toolpath)
+
+    if config.print_time_taken:
+        end = time.time()
+        time_to_generate = end-start
+        print('Generated in: '+str(round(time_to_generate, 3))+' s')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import json
+import time
+import numpy as np
+
+class Metrics:
+    """ Collects the time spent in each stage of the generation and counters for every layer.
+    Stage times are exclusive: time spent in a stage nested inside another one only counts for the inner stage.
+    With profile_cpu the whole block is also run under cProfile, and with profile_memory under tracemalloc.
+
+    with Metrics() as metrics:
+        generate(config)
+    print(metrics.summary())
+    """
+    def __init__(self, profile_cpu=False, profile_memory=False):
+        self.stage_times = {}
+        self.stage_calls = {}
+        self.stack = []
+        self.profile_cpu = profile_cpu
+        self.profile_memory = profile_memory
+        self.profiler = None
+        self.memory = None
+        # Counters of every toolpath that is counted, see count()
+        self.toolpaths = []
+        # Position and extruder state at the end of the last counted toolpath
+        self.position = np.full(3, np.nan)
+        self.extruder_on = True
+        self.wall_time = 0.0
+
+    def __enter__(self):
+        global active
+        self.previous = active
+        active = self
+        if self.profile_memory:
+            import tracemalloc
+            tracemalloc.start()
+        if self.profile_cpu:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global active
+        self.wall_time += time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.profile_memory:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            statistics = tracemalloc.take_snapshot().statistics('lineno')[:10]
+            tracemalloc.stop()
+            self.memory = {"current_mb": current / 2**20, "peak_mb": peak / 2**20,
+                           "top": [{"line": str(statistic.traceback[0]), "size_mb": statistic.size / 2**20, "count": statistic.count} for statistic in statistics]}
+        active = self.previous
+
+    def start_stage(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    def end_stage(self):
+        name, start, children = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        self.stage_times[name] = self.stage_times.get(name, 0.0) + elapsed - children
+        self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+    def add_stages(self, stage_times, stage_calls):
+        # Add the stage times measured in another process
+        for name, seconds in stage_times.items():
+            self.stage_times[name] = self.stage_times.get(name, 0.0) + seconds
+        for name, calls in stage_calls.items():
+            self.stage_calls[name] = self.stage_calls.get(name, 0) + calls
+
+    def count(self, toolpath, kind="layer"):
+        # Count the points, travel moves, extruded length and travel length of a toolpath.
+        # Toolpaths have to be counted in the order they are printed because each one starts where the last one ended.
+        positions, extruding, self.extruder_on = toolpath.positions(self.position, self.extruder_on)
+        points = np.vstack([self.position, positions])
+        self.position = points[-1]
+        lengths = np.nan_to_num(np.sqrt((np.diff(points, axis=0) ** 2).sum(axis=1)))
+
+        self.toolpaths.append({
+            "kind": kind,
+            "points": len(positions),
+            "travel_moves": int((~extruding).sum()),
+            "extruded_length": float(lengths[extruding].sum()),
+            "travel_length": float(lengths[~extruding].sum()),
+        })
+
+    def totals(self):
+        totals = {"layers": sum(1 for counters in self.toolpaths if counters["kind"] == "layer")}
+        for name in ("points", "travel_moves", "extruded_length", "travel_length"):
+            totals[name] = sum(counters[name] for counters in self.toolpaths)
+        return totals
+
+    def profile_functions(self, limit=25):
+        # Functions with the most cumulative time in the cProfile capture
+        if self.profiler is None:
+            return None
+        import pstats
+        stats = pstats.Stats(self.profiler).stats
+        functions = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [{"function": f"{file}:{line}({name})", "calls": calls, "total_time": total_time, "cumulative_time": cumulative_time}
+                for (file, line, name), (_, calls, total_time, cumulative_time, _) in functions]
+
+    def report(self):
+        # Everything that was measured as a dict that can be saved as JSON
+        return {
+            "wall_time": self.wall_time,
+            "stages": {name: {"time": self.stage_times[name], "calls": self.stage_calls[name]} for name in self.stage_times},
+            "totals": self.totals(),
+            "layers": [{key: value for key, value in counters.items() if key != "kind"} for counters in self.toolpaths if counters["kind"] == "layer"],
+            "other_toolpaths": [counters for counters in self.toolpaths if counters["kind"] != "layer"],
+            "profile": self.profile_functions(),
+            "memory": self.memory,
+        }
+
+    def write_report(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=1)
+        if self.profiler is not None:
+            # Can be opened with pstats or tools like snakeviz
+            self.profiler.dump_stats(path.rsplit('.', 1)[0] + '.prof')
+
+    def summary(self):
+        # Short summary for the console
+        lines = ["Stage        Time (s)   Calls"]
+        for name, seconds in sorted(self.stage_times.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"{name:12} {seconds:8.3f} {self.stage_calls[name]:7}")
+        totals = self.totals()
+        lines.append(f"Total: {self.wall_time:.3f} s. {totals['layers']} layers, {totals['points']} points, {totals['travel_moves']} travel moves, "
+                     f"{totals['extruded_length']:.1f} mm extruded, {totals['travel_length']:.1f} mm travel")
+        if self.memory is not None:
+            lines.append(f"Peak traced memory: {self.memory['peak_mb']:.1f} MB")
+        functions = self.profile_functions(5)
+        if functions:
+            lines.append("Slowest functions (cumulative):")
+            lines.extend(f"  {function['cumulative_time']:8.3f} s  {function['function']}" for function in functions)
+        return '\n'.join(lines)
+
+# Metrics that stages are currently recorded to. None when nothing is being measured.
+active = None
+
+class Stage:
+    __slots__ = ("metrics", "name")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.metrics.start_stage(self.name)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.end_stage()
+
+class NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+null_stage = NullStage()
+
+def stage(name):
+    # Context manager that times a stage. Does nothing when no Metrics is active.
+    return null_stage if active is None else Stage(active, name)
+
+def current():
+    # The active Metrics, or None
+    return active
+
+def count(toolpath, kind="layer"):
+    # Count a toolpath in the active Metrics, if there is one
+    if active is not None:
+        active.count(toolpath, kind)
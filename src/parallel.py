@@ -0,0 +1,18 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+def parallel_map(function, tasks, jobs, prefetch=2):
+    # Call function(*task) for every task in a process pool and yield the results in the order of the tasks.
+    # Only jobs * prefetch tasks are in flight at a time, so results don't pile up in memory when the consumer
+    # (for example the G-code writer) is slower than the workers.
+    # Results are pickled back to this process, so they should be compact (arrays, not lists of Points).
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(function, *task))
+            if len(pending) >= jobs * prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
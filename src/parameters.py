@@ -1,9 +1,10 @@
-from infill_modified_triangle_wave import infill_modified_triangle_wave
 import fullcontrol as fc
 
 # Airfoil Parameters
 naca_nums = ['2412', '2412'] # NACA airfoil numbers (for NACA airfoil method)
 num_points = 256 # Resolution of airfoil - higher values give better quality but slower performance and larger file size for gcode
+point_spacing = 'uniform' # Spacing of the points in x: 'uniform' or 'cosine'. Cosine puts more points at the leading and trailing edges and fewer on the flat middle part.
+contour_tolerance = 0 # Remove contour points that are closer than this (in mm) to the simplified contour. Also used for file extraction. 0 keeps every point.
 
 # Wing Parameters
 z_positions = [0, 100]  # Z-coordinates for each airfoil section
@@ -12,19 +13,25 @@ chord_lengths = [100, 75]  # Chord length (mm) for each airfoil. May be differen
 # File Extraction Parameters
 file_extraction = False # Enable to use file extraction, disable for NACA airfoil method
 filenames = ['naca2412.dat', 'naca2412.dat'] # File names for file extraction method. These have to be in the profiles folder.
+profile_dir = 'profiles' # Folder the airfoil files are read from
 
 interpolate=False # Enable if you want to multiply the amount of points the imported airfoil has
 interpolate_airfoil_multiplier = 2 # Multiplier for how many times to multiply the amount of points
+profile_points = None # Resample the airfoil to this many points, closer together where it curves. None keeps the points of the file.
 
 sort_point_order=True # Sorts the points of the airfoil to start and end at min_X or x=0 depending if you have move_leading_edge enabled or not.
 reverse_points_sorting=False # Reverse the direction that sort point order sorts the points to start and end at. If enabled makes the points start and end at max_x or x=chord_length.
 
+profile_cache_dir = 'profiles/.cache' # Folder where parsed airfoil files are cached as .npy files so later runs don't have to parse them again. Set to None to disable.
+
 # Infill Parameters
 generate_infill = True
-infill_density = 6 # Density of infill (higher values = denser infill)
+infill_density = 6 # Density of the modified_triangle_wave infill (higher values = denser infill)
 infill_reverse = False # Enable to reverse infill direction. Used if file_extraction makes the airfoil start at max x instead of min x.
 infill_rise = False # Enable to raise infill by half layer height when returning to start point of infill. Makes the hop from layer to layer smaller.
-infill_type = infill_modified_triangle_wave # Infill pattern type
+infill_type = 'modified_triangle_wave' # Infill pattern type: 'modified_triangle_wave', 'rectilinear', 'grid' or 'gyroid'
+infill_spacing = 5 # (mm) Distance between the lines of the rectilinear, grid and gyroid infill
+infill_angle = 45 # (degrees) Angle of the lines of the rectilinear, grid and gyroid infill
 
 # Fully filled layer
 filled_layers_enabled = False
@@ -36,9 +43,9 @@ generate_circle = False
 circle_centers = [ # Center points for start and end of circle
     {"start_center": fc.Point(x=43.8, y=1.35, z=min(z_positions)), "end_center": fc.Point(x=43.8, y=1.35, z=max(z_positions))},
 ]
-circle_radius = 4 # Radius of circle
+circle_radius = 4 # Radius of circle. Can also be a list with a radius for each circle, where [start, end] tapers the circle from its start_center to its end_center, for example [[5, 3]]
 circle_num_points = 24 # Number of points in circle
-circle_offset = 0.75 # Offset for second circle
+circle_offset = 0.75 # Offset for second circle. Can be a list for each circle like circle_radius
 circle_segment_angle = 45 # Angle covered by each pass when drawing circle
 circle_start_angle = 180 # Starting angle for circle. Started on the outer circle.
 
@@ -72,6 +79,9 @@ z_hop_amount = 50 # Height to move extruder up after printing
 # 3D Printing Configuration
 gcode_generation = False # Enable gcode generation.
 gcode_name = 'gcode_output' # Output filename for G-code
+arc_features = [] # Features written as G2/G3 arcs where they fit: 'contour', 'circles', 'infill' and/or 'fill'. For example ['contour', 'circles']. Needs arc support in the firmware.
+arc_tolerance = 0.01 # (mm) How far an arc may be from the points and the straight moves it replaces
+save_toolpath = None # Save the generated toolpath to this .npz file, for example 'wing.npz'. It can be turned into G-code or plotted again with python src/main.py --load-toolpath wing.npz
 
 # Printer Specific Settings
 printer_settings = {
@@ -86,6 +96,17 @@ printer_settings = {
 # Plot Settings
 plot_neat_for_publishing = True # Hides travel moves and the coordinates so the plot is just a 3d view of the airfoil. Used in for example taking images for the documentation.
 plot_style = "tube" # Options: "tube" and "line". Tube shows the lines in 3d as, well tubes. The line option shows the lines as 2d lines.
+preview_layer_step = 1 # Only plot every Nth layer. The first, last and filled layers are always plotted. Makes the plot of a tall wing much faster.
+preview_max_points = None # Plot at most about this many printed points per layer, for example 500. None plots every point.
+preview_key_layers = False # Only plot the first, last and filled layers
+preview_export = None # Save the plotted toolpaths to this binary line buffer file for other viewers, for example 'preview.bin'
+
+# Performance Settings
+optimize_travel = False # Reorder the contour, infill, circles and fill lines of each layer to make the travel moves between them shorter
+jobs = 1 # Number of processes used to generate the layers. Can also be set with the --jobs command line option.
+layer_chunk_size = 16 # Number of layers generated at a time. With jobs > 1 each process gets this many layers at a time.
+layer_cache_dir = None # Folder where generated layers are cached in chunks of layer_chunk_size, so a rerun only generates the chunks whose settings changed, for example '.cache/layers'. None disables the cache.
+layer_cache_size_mb = 512 # Size of the layer cache. The least recently used files are deleted when it gets bigger.
 
 # Debug Settings
 print_total_layers = True
@@ -94,5 +115,11 @@ print_rendering_plot_done = True
 print_generating_gcode = True
 print_time_taken = True
 print_generation_done = True
+print_travel_saved = True # Print how much shorter optimize_travel made the travel moves
+print_contour_points = True # Print how many contour points point_spacing, profile_points and contour_tolerance removed
+print_metrics = False # Print how long each stage of the generation took and how many points, travel moves and mm of extrusion the wing has
+metrics_report = None # Save the stage times and the counters of every layer to this JSON file, for example 'metrics.json'
+profile_cpu = False # Also run the generation under cProfile. Needs print_metrics or metrics_report
+profile_memory = False # Also trace the memory allocations with tracemalloc. Needs print_metrics or metrics_report
 
 # SETTINGS END
@@ -0,0 +1,52 @@
+import numpy as np
+from sections import layer_chords, layer_shifts
+
+# One row per layer of the wing
+PLAN_DTYPE = np.dtype([
+    ("index", np.int64), # Layer number in the whole wing
+    ("section", np.int32), # Section the layer is in, between z_positions[section] and z_positions[section + 1]
+    ("layer", np.int32), # Layer number in the section
+    ("z", np.float64),
+    ("t", np.float64), # Height of the layer in the section, from 0 to 1
+    ("chord", np.float64),
+    ("shift", np.float64), # x offset of the contour
+    ("infill", np.bool_),
+    ("circles", np.bool_),
+    ("fill", np.bool_),
+])
+
+def section_layer_count(config, i):
+    return int((config.z_positions[i+1] - config.z_positions[i]) / config.layer_height)
+
+def layer_number(z, layer_height):
+    # Integer number of the layer at height z, used to match layers to filled_layers without comparing floats
+    return np.rint(np.asarray(z, dtype=np.float64) / layer_height).astype(np.int64)
+
+def section_plan(config, i, first_index=0):
+    # Plan of the layers of section i. first_index is the index of the first layer in the whole wing.
+    num_layers = section_layer_count(config, i)
+    layers = np.arange(num_layers)
+    plan = np.zeros(num_layers, dtype=PLAN_DTYPE)
+    plan["index"] = first_index + layers
+    plan["section"] = i
+    plan["layer"] = layers
+    plan["z"] = config.z_positions[i] + layers * config.layer_height
+    plan["t"] = layers / num_layers
+    plan["chord"] = layer_chords(config.chord_lengths[i], config.chord_lengths[i+1], plan["t"], config.curved_wing, config.curve_amount)
+    plan["shift"] = layer_shifts(config.chord_lengths[i], plan["chord"], config.move_leading_edge, config.move_trailing_edge)
+
+    # Filled layers are matched by layer number, so a z in filled_layers matches the layer it rounds to
+    filled = config.filled_layers_enabled & np.isin(layer_number(plan["z"], config.layer_height), layer_number(config.filled_layers, config.layer_height))
+    plan["fill"] = filled
+    plan["infill"] = config.generate_infill & ~filled
+    plan["circles"] = config.generate_circle & ~filled
+    return plan
+
+def layer_plan(config):
+    # Plan of every layer of the wing as a structured array with PLAN_DTYPE. Doesn't generate any geometry.
+    plans = []
+    first_index = 0
+    for i in range(len(config.z_positions) - 1):
+        plans.append(section_plan(config, i, first_index))
+        first_index += len(plans[-1])
+    return np.concatenate(plans) if plans else np.zeros(0, dtype=PLAN_DTYPE)
@@ -0,0 +1,11 @@
+import fullcontrol as fc
+from toolpath import Toolpath
+
+def plot_toolpaths(toolpaths, config):
+    # Render the wing with the fullcontrol plot. Imported only when a plot is requested.
+    # Fullcontrol steps are only created for the output
+    steps = Toolpath.concat(toolpaths).to_steps()
+    if config.plot_neat_for_publishing:
+        fc.transform(steps, 'plot', fc.PlotControls(color_type='print_sequence', style=config.plot_style, neat_for_publishing = True, zoom = 0.8, hide_travel=True, line_width=10))
+    else: 
+        fc.transform(steps, 'plot', fc.PlotControls(color_type='print_sequence', style=config.plot_style))
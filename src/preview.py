@@ -0,0 +1,126 @@
+""" Level of detail preview of a wing.
+
+The plot renders every point it gets, which for a tall wing is slow and can hang the browser. Preview keeps
+a decimated copy of the toolpaths while the wing is generated: only every Nth layer, or only the first, last and
+filled layers, with at most a set number of printed points per layer. The copy can be plotted and written
+to a line buffer file for other viewers.
+"""
+import struct
+import numpy as np
+from metrics import stage
+from toolpath import Toolpath, PRINT, TRAVEL, FILL
+
+# Line buffer file: header, float32 x, y, z of every vertex, uint32 first vertex and end (one past the last vertex)
+# of every layer, then a uint8 flags byte per vertex. Bit 0 of the flags is set when the line from the previous vertex is extruded,
+# the bits above it are the feature (see toolpath.FEATURES). Little endian. Vertices before the first layer
+# or after the last one are the calibration moves and the z-hop.
+LINE_BUFFER_MAGIC = b'WPRV'
+LINE_BUFFER_VERSION = 2
+LINE_BUFFER_HEADER = struct.Struct('<4sIII') # magic, version, number of vertices, number of layers
+
+def decimate_layer(layer, max_points):
+    # Layer with at most about max_points printed rows. Every max_points'th printed row is kept, along with the last
+    # printed row before each travel and every row that isn't a printed move, so the lines still end where they did.
+    printed = layer.move == PRINT
+    rows = np.flatnonzero(printed)
+    if max_points is None or len(rows) <= max_points:
+        return layer
+    keep = ~printed
+    keep[rows[::-(-len(rows) // max_points)]] = True
+    keep[:-1] |= printed[:-1] & ~printed[1:]
+    keep[-1] = True
+    return Toolpath(layer.x[keep], layer.y[keep], layer.z[keep], layer.move[keep], [0, int(keep.sum())], layer.feature[keep])
+
+class Preview:
+    """ Collects the decimated toolpaths of the preview. Layers are decimated as they are added, so only the preview
+    is kept in memory. The first and last layer and the filled layers are always kept.
+
+    preview = Preview(layer_step=10, max_points=500)
+    for toolpath in preview.collect(wing_toolpaths(config)):
+        ...
+    plot_toolpaths(preview.toolpaths(), config)
+    """
+    def __init__(self, layer_step=1, max_points=None, key_layers=False):
+        if layer_step < 1:
+            raise ValueError(f"preview_layer_step has to be at least 1, not {layer_step}")
+        if max_points is not None and max_points < 2:
+            raise ValueError(f"preview_max_points has to be at least 2 or None, not {max_points}")
+        self.layer_step = layer_step
+        self.max_points = max_points
+        self.key_layers = key_layers
+        self.kept = []
+        self.layers = 0
+        # The last layer that was left out. Kept until the next layer, because it is shown if it is the last one.
+        self.held = None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.preview_layer_step, config.preview_max_points, config.preview_key_layers)
+
+    def add(self, toolpath):
+        with stage("preview"):
+            if not toolpath.num_layers:
+                # The calibration moves and the z-hop. The z-hop comes after the last layer.
+                self.release()
+                self.kept.append(toolpath)
+                return
+            filled = bool((toolpath.feature == FILL).any())
+            regular = not self.key_layers and self.layers % self.layer_step == 0
+            self.layers += 1
+            if self.layers == 1 or filled or regular:
+                self.held = None
+                self.kept.append(decimate_layer(toolpath, self.max_points))
+            else:
+                self.held = toolpath
+
+    def release(self):
+        if self.held is not None:
+            self.kept.append(decimate_layer(self.held, self.max_points))
+            self.held = None
+
+    def collect(self, toolpaths):
+        # Pass the toolpaths through, adding each one to the preview
+        for toolpath in toolpaths:
+            self.add(toolpath)
+            yield toolpath
+
+    def toolpaths(self):
+        # The toolpaths of the preview, in order
+        self.release()
+        return self.kept
+
+def write_line_buffer(toolpaths, path):
+    # Write toolpaths to a line buffer file, see LINE_BUFFER_HEADER. Returns the number of vertices.
+    positions, flags, layer_ranges = [], [], []
+    position = np.full(3, np.nan)
+    extruder_on = True
+    vertices = 0
+    for toolpath in toolpaths:
+        points, extruding, extruder_on = toolpath.positions(position, extruder_on)
+        if toolpath.num_layers:
+            layer_ranges.append((vertices, vertices + len(points)))
+        if len(points):
+            position = points[-1]
+            moves = (toolpath.move == PRINT) | (toolpath.move == TRAVEL)
+            positions.append(points.astype('<f4'))
+            flags.append(extruding.astype(np.uint8) | (toolpath.feature[moves] << 1))
+            vertices += len(points)
+
+    with open(path, 'wb') as file:
+        file.write(LINE_BUFFER_HEADER.pack(LINE_BUFFER_MAGIC, LINE_BUFFER_VERSION, vertices, len(layer_ranges)))
+        # Vertices that were never set (x and y of a z-hop at the start) are written as 0
+        file.write(np.nan_to_num(np.concatenate(positions) if positions else np.zeros((0, 3), '<f4')).tobytes())
+        file.write(np.asarray(layer_ranges, dtype='<u4').reshape(-1, 2).tobytes())
+        file.write((np.concatenate(flags) if flags else np.zeros(0, np.uint8)).tobytes())
+    return vertices
+
+def read_line_buffer(path):
+    # (positions, flags, layer_ranges) of a line buffer file. layer_ranges has the first vertex and the end of every layer.
+    with open(path, 'rb') as file:
+        magic, version, vertices, layers = LINE_BUFFER_HEADER.unpack(file.read(LINE_BUFFER_HEADER.size))
+        if magic != LINE_BUFFER_MAGIC or version != LINE_BUFFER_VERSION:
+            raise ValueError(f"{path} is not a version {LINE_BUFFER_VERSION} line buffer file")
+        positions = np.fromfile(file, dtype='<f4', count=3 * vertices).reshape(vertices, 3)
+        layer_ranges = np.fromfile(file, dtype='<u4', count=2 * layers).reshape(layers, 2)
+        flags = np.fromfile(file, dtype=np.uint8, count=vertices)
+    return positions, flags, layer_ranges
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import numpy as np
+from resample import resample_contour, simplify_contour
+
+def read_profile(path):
+    # First line of a .dat file is the name of the airfoil, the rest are x y pairs.
+    return np.loadtxt(path, skiprows=1, ndmin=2, dtype=np.float64)[:, :2]
+
+def interpolate_profile(profile, multiplier):
+    # Same as inserting the midpoint of every pair of neighbouring points multiplier times.
+    midpoints = (profile[:-1] + profile[1:]) / 2
+    blocks = np.concatenate([profile[:-1, None, :], np.repeat(midpoints[:, None, :], multiplier, axis=1)], axis=1)
+    return np.concatenate([blocks.reshape(-1, 2), profile[-1:]])
+
+def sort_profile(profile, reverse_order):
+    # Upper surface (y > 0) first and the rest after it, sorted in opposite x directions so the
+    # contour starts and ends at the same edge. Stable sorts keep the order of points with equal x.
+    upper = profile[profile[:, 1] > 0]
+    lower = profile[~(profile[:, 1] > 0)]
+    upper = upper[np.argsort(-upper[:, 0] if reverse_order else upper[:, 0], kind='stable')]
+    lower = lower[np.argsort(lower[:, 0] if reverse_order else -lower[:, 0], kind='stable')]
+    return np.concatenate([upper, lower])
+
+class ProfileStore:
+    """ Loads airfoil profiles from .dat files once and keeps them as (n, 2) arrays in the units of the file.
+    Profiles are keyed by filename, modification time and the interpolation, sorting and resampling settings.
+    If cache_dir is set, the processed profiles are also saved there as .npy files so later runs skip parsing.
+    A cache file that can't be read or written is skipped and the profile is parsed from the .dat file.
+    """
+    def __init__(self, profile_dir="profiles", cache_dir=None):
+        self.profile_dir = profile_dir
+        self.cache_dir = cache_dir
+        self.profiles = {}
+
+    def key(self, filename, interpolate, multiplier, sort, reverse, points=None, tolerance=0):
+        stat = os.stat(os.path.join(self.profile_dir, filename))
+        return (filename, stat.st_mtime_ns, stat.st_size, bool(interpolate), int(multiplier) if interpolate else 0, bool(sort), bool(sort) and bool(reverse),
+                None if points is None else int(points), float(tolerance))
+
+    def cache_path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{os.path.splitext(key[0])[0]}-{digest}.npy")
+
+    def load(self, filename, interpolate=False, multiplier=2, sort=True, reverse=False, points=None, tolerance=0):
+        # points resamples the profile to that many points, more of them where it curves.
+        # tolerance removes the points that are closer than that (in units of the file) to the simplified profile.
+        key = self.key(filename, interpolate, multiplier, sort, reverse, points, tolerance)
+        profile = self.profiles.get(key)
+        if profile is not None:
+            return profile
+
+        profile = self.load_cached(key)
+        if profile is None:
+            profile = read_profile(os.path.join(self.profile_dir, filename))
+            if interpolate:
+                profile = interpolate_profile(profile, multiplier)
+            if sort:
+                profile = sort_profile(profile, reverse)
+            if points is not None:
+                profile = resample_contour(profile, points)
+            if tolerance > 0:
+                profile = simplify_contour(profile, tolerance)
+            if self.cache_dir is not None:
+                self.save(key, profile)
+
+        # The same array is handed out for every layer so it must not be modified.
+        profile.setflags(write=False)
+        self.profiles[key] = profile
+        return profile
+
+    def load_cached(self, key):
+        # The profile from the cache, or None
+        if self.cache_dir is None:
+            return None
+        try:
+            return np.load(self.cache_path(key))
+        except (OSError, ValueError, EOFError):
+            return None
+
+    def save(self, key, profile):
+        path = self.cache_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_path, 'wb') as file:
+                np.save(file, profile)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
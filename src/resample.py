@@ -0,0 +1,53 @@
+import numpy as np
+
+def cosine_spacing(num_points):
+    # x positions from 0 to 1 that are close together at both ends and far apart in the middle,
+    # where the surface of an airfoil is flat
+    return (1 - np.cos(np.linspace(0, np.pi, num_points))) / 2
+
+def resample_contour(contour, num_points):
+    # Resample a contour to num_points points spaced by arc length plus turning angle, so curved parts like the leading edge
+    # get more points than flat ones. Both count the same: the turning is weighted by total length / total turning.
+    # The first and last points are kept.
+    segments = np.diff(contour, axis=0)
+    lengths = np.hypot(segments[:, 0], segments[:, 1])
+    headings = np.arctan2(segments[:, 1], segments[:, 0])
+    turns = np.abs((np.diff(headings) + np.pi) % (2 * np.pi) - np.pi)
+    # Half of the turn at a point is added to each of the segments next to it
+    segment_turns = np.zeros(len(segments))
+    segment_turns[:-1] += turns / 2
+    segment_turns[1:] += turns / 2
+    total_turn = segment_turns.sum()
+    weight = lengths.sum() / total_turn if total_turn > 0 else 0.0
+
+    distance = np.concatenate([[0.0], np.cumsum(lengths + weight * segment_turns)])
+    targets = np.linspace(0, distance[-1], num_points)
+    return np.column_stack([np.interp(targets, distance, contour[:, 0]), np.interp(targets, distance, contour[:, 1])])
+
+def segment_distances(points, start, end):
+    # Distance of every point to the segment from start to end
+    segment = end - start
+    relative = points - start
+    length_squared = segment @ segment
+    t = np.clip(relative @ segment / length_squared, 0, 1) if length_squared > 0 else np.zeros(len(points))
+    offset = relative - t[:, None] * segment
+    return np.hypot(offset[:, 0], offset[:, 1])
+
+def simplify_contour(contour, tolerance):
+    # Douglas-Peucker: remove the points that are less than tolerance away from the simplified contour.
+    # The first and last points are always kept.
+    keep = np.zeros(len(contour), dtype=bool)
+    keep[[0, -1]] = True
+    ranges = [(0, len(contour) - 1)]
+    while ranges:
+        first, last = ranges.pop()
+        if last - first < 2:
+            continue
+        distances = segment_distances(contour[first+1:last], contour[first], contour[last])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            ranges.append((first, middle))
+            ranges.append((middle, last))
+    return contour[keep]
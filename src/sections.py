@@ -0,0 +1,63 @@
+import functools
+import numpy as np
+from resample import cosine_spacing, simplify_contour
+
+@functools.lru_cache(maxsize=None)
+def naca_contour(naca_num, num_points, spacing='uniform', tolerance=0):
+    # Contour of a 4-digit NACA airfoil with a chord of 1. Upper surface from the leading edge to the
+    # trailing edge, then the lower surface back to the leading edge. Returns an (2 * num_points, 2) array,
+    # or fewer points if tolerance (in units of the chord) is set. x is spaced evenly with spacing='uniform'
+    # and closer together at the leading and trailing edges with spacing='cosine'.
+    # The result is cached and shared, so it is read-only.
+    naca_length = len(naca_num)
+    if naca_length != 4 and naca_length != 3:
+        raise ValueError("Invalid NACA number. Must be 4 or 3 digits long. See: https://en.m.wikipedia.org/wiki/NACA_airfoil#Four-digit_series for formatting.")
+    m = int(naca_num[0]) / 100
+    p = int(naca_num[1]) / 10
+    t = int(naca_num[2:]) / 100
+    if spacing == 'uniform':
+        x = np.linspace(0, 1, num_points)
+    elif spacing == 'cosine':
+        x = cosine_spacing(num_points)
+    else:
+        raise ValueError(f"Unknown point_spacing '{spacing}'. Use 'uniform' or 'cosine'.")
+    y_t = 5 * t * (0.2969 * np.sqrt(x) - 0.126 * x - 0.3516 * x**2 + 0.2843 * x**3 - 0.1015 * x**4)
+    if p == 0:
+        yc = np.zeros_like(x)
+    else:
+        yc = np.where(x < p, m / p**2 * (2 * p * x - x**2), m / (1 - p)**2 * ((1 - 2 * p) + 2 * p * x - x**2))
+    theta = np.arctan(np.gradient(yc, x))
+    xu = x - y_t * np.sin(theta)
+    xl = x + y_t * np.sin(theta)
+    yu = yc + y_t * np.cos(theta)
+    yl = yc - y_t * np.cos(theta)
+    contour = np.column_stack([np.concatenate([xu, xl[::-1]]), np.concatenate([yu, yl[::-1]])])
+    if tolerance > 0:
+        contour = simplify_contour(contour, tolerance)
+    contour.setflags(write=False)
+    return contour
+
+def layer_chords(start_chord, end_chord, t, curved=False, curve_amount=1):
+    # Chord length of layers in a section. t is the normalized height of each layer within the section.
+    if curved:
+        # Quadratic interpolation
+        return start_chord + (end_chord - start_chord) * (t**2) * curve_amount
+    # Linear interpolation
+    return start_chord + (end_chord - start_chord) * t
+
+def layer_shifts(start_chord, chords, move_leading_edge, move_trailing_edge):
+    # Move airfoil based on chord lengths if edge is not set as straight
+    # Calculating these in a different way leads to a weird bug where the infill spills out.
+    # For now this method works.
+    if move_trailing_edge and not move_leading_edge:
+        return np.zeros_like(chords)
+    if move_leading_edge and not move_trailing_edge:
+        return start_chord - chords
+    return (start_chord - chords) / 2
+
+def section_layers(contour, chords, shifts, z_values):
+    # Scale the unit contour of a section to every layer at once. Returns x, y and z arrays with shape (layers, points).
+    x = contour[None, :, 0] * chords[:, None] + shifts[:, None]
+    y = contour[None, :, 1] * chords[:, None]
+    z = np.broadcast_to(np.asarray(z_values, dtype=np.float64)[:, None], x.shape)
+    return x, y, z
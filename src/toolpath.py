@@ -0,0 +1,142 @@
+import numpy as np
+import fullcontrol as fc
+
+# Move types stored in Toolpath.move
+PRINT = 0 # Move to the point with the extruder in its current state
+TRAVEL = 1 # Extruder off, move to the point, extruder on. Same as fc.travel_to
+EXTRUDER_OFF = 2 # Turn the extruder off. The coordinates of the row are not used
+EXTRUDER_ON = 3 # Turn the extruder on. The coordinates of the row are not used
+
+# Features stored in Toolpath.feature, so the output can treat them differently
+OTHER = 0 # Travel moves, calibration moves and the z-hop
+CONTOUR = 1
+INFILL = 2
+CIRCLES = 3
+FILL = 4
+FEATURES = {"contour": CONTOUR, "infill": INFILL, "circles": CIRCLES, "fill": FILL}
+
+class Toolpath:
+    """ Toolpath stored as contiguous float64 x, y and z arrays and uint8 move type and feature columns.
+    Coordinates that are not set (like x and y of a z-hop) are NaN.
+    Layer k is the rows layer_offsets[k]:layer_offsets[k+1]. Rows before the first layer or after the last one
+    (calibration moves, z-hop) don't belong to any layer.
+    """
+    def __init__(self, x, y, z, move=PRINT, layer_offsets=(), feature=OTHER):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.z = np.asarray(z, dtype=np.float64)
+        self.move = np.ascontiguousarray(np.broadcast_to(np.asarray(move, dtype=np.uint8), self.x.shape))
+        self.layer_offsets = np.asarray(layer_offsets, dtype=np.int64)
+        self.feature = np.ascontiguousarray(np.broadcast_to(np.asarray(feature, dtype=np.uint8), self.x.shape))
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0), np.empty(0), np.empty(0))
+
+    @classmethod
+    def points(cls, x, y, z):
+        # Printed points. Scalars are broadcast to the length of the arrays.
+        x, y, z = np.broadcast_arrays(np.atleast_1d(np.asarray(x, dtype=np.float64)), np.asarray(y, dtype=np.float64), np.asarray(z, dtype=np.float64))
+        return cls(np.ascontiguousarray(x), np.ascontiguousarray(y), np.ascontiguousarray(z))
+
+    @classmethod
+    def travel(cls, x, y, z):
+        toolpath = cls.points(x, y, z)
+        toolpath.move = np.full(len(toolpath), TRAVEL, dtype=np.uint8)
+        return toolpath
+
+    @classmethod
+    def extruder(cls, on):
+        return cls([np.nan], [np.nan], [np.nan], EXTRUDER_ON if on else EXTRUDER_OFF)
+
+    @classmethod
+    def concat(cls, toolpaths):
+        toolpaths = [toolpath for toolpath in toolpaths if len(toolpath)]
+        if not toolpaths:
+            return cls.empty()
+        offsets = []
+        start = 0
+        for toolpath in toolpaths:
+            if toolpath.num_layers:
+                layer_offsets = toolpath.layer_offsets + start
+                # Rows between two layers belong to the later layer
+                offsets.append(layer_offsets[1:] if offsets else layer_offsets)
+            start += len(toolpath)
+        return cls(
+            np.concatenate([toolpath.x for toolpath in toolpaths]),
+            np.concatenate([toolpath.y for toolpath in toolpaths]),
+            np.concatenate([toolpath.z for toolpath in toolpaths]),
+            np.concatenate([toolpath.move for toolpath in toolpaths]),
+            np.concatenate(offsets) if offsets else (),
+            np.concatenate([toolpath.feature for toolpath in toolpaths]))
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def num_layers(self):
+        return max(len(self.layer_offsets) - 1, 0)
+
+    def as_layer(self):
+        # The whole toolpath as a single layer
+        return Toolpath(self.x, self.y, self.z, self.move, [0, len(self)], self.feature)
+
+    def with_feature(self, feature):
+        # The same toolpath with every row marked as feature
+        return Toolpath(self.x, self.y, self.z, self.move, self.layer_offsets, feature)
+
+    def layer(self, k):
+        start, stop = self.layer_offsets[k], self.layer_offsets[k + 1]
+        return Toolpath(self.x[start:stop], self.y[start:stop], self.z[start:stop], self.move[start:stop], [0, stop - start], self.feature[start:stop])
+
+    def positions(self, position=(np.nan, np.nan, np.nan), extruder_on=True):
+        # Where the print head is after each move, whether the move extrudes, and the extruder state at the end.
+        # position and extruder_on are the state before the toolpath. Coordinates that are NaN keep the value
+        # of the previous point, and the extruder rows are left out.
+        move = self.move
+        moves = (move == PRINT) | (move == TRAVEL)
+
+        # Extruder state at every move: set by the extruder rows and kept until the next one
+        switches = np.flatnonzero((move == EXTRUDER_OFF) | (move == EXTRUDER_ON))
+        state = np.concatenate([[extruder_on], move[switches] == EXTRUDER_ON])
+        extruding = (move[moves] == PRINT) & state[np.searchsorted(switches, np.flatnonzero(moves), side='right')]
+
+        points = np.vstack([position, np.stack([self.x[moves], self.y[moves], self.z[moves]], axis=1)])
+        for column in range(3):
+            index = np.where(np.isnan(points[:, column]), 0, np.arange(len(points)))
+            np.maximum.accumulate(index, out=index)
+            points[:, column] = points[index, column]
+        return points[1:], extruding, bool(state[-1])
+
+    def translate(self, x=0, y=0, z=0):
+        return Toolpath(self.x + x, self.y + y, self.z + z, self.move, self.layer_offsets, self.feature)
+
+    def to_steps(self, arcs=None):
+        # Convert to a list of fullcontrol steps. Only needed when fullcontrol has to process the toolpath.
+        # arcs maps a row to (last row, arc step): the arc step replaces the rows after that row up to the last row,
+        # see arc_fitting.find_arcs.
+        steps = []
+        nan = np.isnan(self.x) | np.isnan(self.y) | np.isnan(self.z)
+        skip_to = -1
+        for row, (x, y, z, move, is_nan) in enumerate(zip(self.x.tolist(), self.y.tolist(), self.z.tolist(), self.move.tolist(), nan.tolist())):
+            if row < skip_to:
+                continue
+            # The row an arc ends on is written by the arc, but the next arc can start from it
+            if row > skip_to:
+                if move == EXTRUDER_OFF:
+                    steps.append(fc.Extruder(on=False))
+                elif move == EXTRUDER_ON:
+                    steps.append(fc.Extruder(on=True))
+                else:
+                    if is_nan:
+                        point = fc.Point(x=None if x != x else x, y=None if y != y else y, z=None if z != z else z)
+                    else:
+                        point = fc.Point(x=x, y=y, z=z)
+                    if move == TRAVEL:
+                        steps.extend(fc.travel_to(point))
+                    else:
+                        steps.append(point)
+            if arcs is not None and row in arcs:
+                skip_to, arc = arcs[row]
+                steps.append(arc)
+        return steps
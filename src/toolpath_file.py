@@ -0,0 +1,147 @@
+""" Save generated toolpaths to a file and load them again, so G-code and plots can be made without generating the wing.
+
+The file is an uncompressed .npz file that np.load can read. It has the x, y, z, move and feature columns and the
+layer_offsets of a Toolpath as .npy members, and a metadata member with a JSON string: the format version, the number
+of rows and layers and the settings the wing was generated with. The columns are stored uncompressed, so
+load_toolpath can memory map them and a toolpath bigger than the memory can be written as G-code layer by layer.
+"""
+import datetime
+import json
+import os
+import shutil
+import struct
+import tempfile
+import zipfile
+import numpy as np
+from toolpath import Toolpath
+
+FORMAT = "wing_toolpath"
+FORMAT_VERSION = 1
+COLUMNS = {"x": np.dtype('<f8'), "y": np.dtype('<f8'), "z": np.dtype('<f8'), "move": np.dtype('u1'), "feature": np.dtype('u1')}
+
+class ToolpathWriter:
+    """ Writes toolpaths to a toolpath file as they are generated. The columns are written to temporary files
+    next to the output and put together by close(), so the whole wing is never in memory.
+
+    writer = ToolpathWriter("wing.npz", config)
+    for toolpath in writer.collect(wing_toolpaths(config)):
+        ...
+    writer.close()
+    """
+    def __init__(self, path, config=None):
+        self.path = path
+        self.config = config
+        self.temp_dir = tempfile.mkdtemp(prefix=".toolpath-", dir=os.path.dirname(os.path.abspath(path)))
+        self.files = {name: open(os.path.join(self.temp_dir, name), 'wb') for name in COLUMNS}
+        self.rows = 0
+        self.layer_offsets = []
+
+    def add(self, toolpath):
+        if toolpath.num_layers:
+            # Rows between two layers belong to the later layer, like in Toolpath.concat
+            offsets = (toolpath.layer_offsets + self.rows).tolist()
+            self.layer_offsets.extend(offsets[1:] if self.layer_offsets else offsets)
+        for name, dtype in COLUMNS.items():
+            self.files[name].write(np.ascontiguousarray(getattr(toolpath, name), dtype=dtype).tobytes())
+        self.rows += len(toolpath)
+
+    def collect(self, toolpaths):
+        # Pass the toolpaths through, writing each one
+        try:
+            for toolpath in toolpaths:
+                self.add(toolpath)
+                yield toolpath
+        except BaseException:
+            self.abort()
+            raise
+
+    def metadata(self):
+        return {
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "rows": self.rows,
+            "layers": max(len(self.layer_offsets) - 1, 0),
+            "created": datetime.datetime.now().isoformat(timespec='seconds'),
+            "config": self.config.to_dict() if self.config is not None else None,
+        }
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+        temp_path = os.path.join(self.temp_dir, "toolpath.npz")
+        # force_zip64 because the columns can be bigger than 4 GB
+        with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_STORED) as archive:
+            for name, dtype in COLUMNS.items():
+                with archive.open(name + ".npy", 'w', force_zip64=True) as member, open(self.files[name].name, 'rb') as column:
+                    np.lib.format.write_array_header_1_0(member, {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (self.rows,)})
+                    shutil.copyfileobj(column, member, 2**22)
+            write_array(archive, "layer_offsets", np.asarray(self.layer_offsets, dtype='<i8'))
+            write_array(archive, "metadata", np.array(json.dumps(self.metadata())))
+        os.replace(temp_path, self.path)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def abort(self):
+        for file in self.files.values():
+            file.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+def write_array(archive, name, array):
+    with archive.open(name + ".npy", 'w', force_zip64=True) as member:
+        np.lib.format.write_array(member, array, allow_pickle=False)
+
+def save_toolpath(path, toolpaths, config=None):
+    # Write toolpaths (a Toolpath or an iterable of them) to a toolpath file
+    writer = ToolpathWriter(path, config)
+    for _ in writer.collect([toolpaths] if isinstance(toolpaths, Toolpath) else toolpaths):
+        pass
+    writer.close()
+
+def member_array(path, archive, name, mmap):
+    # Array of the .npy member name. Memory mapped if mmap is set, which only works because the members are stored uncompressed.
+    info = archive.getinfo(name + ".npy")
+    if not mmap or info.compress_type != zipfile.ZIP_STORED:
+        with archive.open(info) as member:
+            return np.lib.format.read_array(member, allow_pickle=False)
+    with open(path, 'rb') as file:
+        # The data of a member starts after its local file header, which is 30 bytes and the name and extra field
+        file.seek(info.header_offset)
+        name_length, extra_length = struct.unpack('<HH', file.read(30)[26:30])
+        file.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(file)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(file)
+        offset = file.tell()
+    if fortran_order or 0 in shape:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+
+def load_toolpath(path, mmap=True):
+    # (Toolpath, metadata) of a toolpath file. With mmap the columns are read from the file when they are used,
+    # so the toolpath doesn't have to fit in memory.
+    with zipfile.ZipFile(path) as archive:
+        metadata = json.loads(member_array(path, archive, "metadata", False).item())
+        if metadata.get("format") != FORMAT:
+            raise ValueError(f"{path} is not a toolpath file")
+        if metadata["version"] > FORMAT_VERSION:
+            raise ValueError(f"{path} is a version {metadata['version']} toolpath file. This version can read up to version {FORMAT_VERSION}.")
+        columns = {name: member_array(path, archive, name, mmap) for name in COLUMNS}
+        layer_offsets = member_array(path, archive, "layer_offsets", False)
+    return Toolpath(columns["x"], columns["y"], columns["z"], columns["move"], layer_offsets, columns["feature"]), metadata
+
+def toolpath_pieces(toolpath):
+    # The rows before the first layer, every layer and the rows after the last layer, like wing_toolpaths yields them.
+    # The pieces are views, so a memory mapped toolpath is only read one layer at a time.
+    if not toolpath.num_layers:
+        if len(toolpath):
+            yield toolpath
+        return
+    first, last = toolpath.layer_offsets[0], toolpath.layer_offsets[-1]
+    if first > 0:
+        yield rows(toolpath, 0, first)
+    for k in range(toolpath.num_layers):
+        yield toolpath.layer(k)
+    if last < len(toolpath):
+        yield rows(toolpath, last, len(toolpath))
+
+def rows(toolpath, start, stop):
+    return Toolpath(toolpath.x[start:stop], toolpath.y[start:stop], toolpath.z[start:stop], toolpath.move[start:stop], (), toolpath.feature[start:stop])
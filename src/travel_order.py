@@ -0,0 +1,149 @@
+import numpy as np
+from toolpath import Toolpath, PRINT, TRAVEL
+
+class Group:
+    """ Rows of a layer that are printed in one go: a contour, the infill, one circle or one fill line.
+    A closed group (the contour) can be started at any of its points. An open group can be printed in either direction
+    if all of its points are at the same z.
+    """
+    def __init__(self, rows, x, y, z):
+        self.rows = rows
+        points = np.column_stack([x[rows], y[rows]])
+        self.closed = len(rows) > 2 and np.array_equal(points[0], points[-1]) and z[rows[0]] == z[rows[-1]]
+        self.reversible = self.closed or bool((z[rows] == z[rows[0]]).all())
+        self.points = points[:-1] if self.closed else points
+        self.entry = 0 # Index in points where the group starts
+        self.reversed = False
+
+    def ends(self):
+        # (start point, end point) with the current entry and direction
+        if self.closed:
+            return self.points[self.entry], self.points[self.entry]
+        if self.reversed:
+            return self.points[-1], self.points[0]
+        return self.points[0], self.points[-1]
+
+    def enter_from(self, position):
+        # Pick the start of the group that is closest to position. Returns the distance to it.
+        if self.closed:
+            distances = np.hypot(self.points[:, 0] - position[0], self.points[:, 1] - position[1])
+            self.entry = int(np.argmin(distances))
+            return distances[self.entry]
+        start = np.hypot(*(self.points[0] - position))
+        end = np.hypot(*(self.points[-1] - position))
+        self.reversed = self.reversible and end < start
+        return end if self.reversed else start
+
+    def ordered_rows(self):
+        if self.closed:
+            # Start and end at the entry point. The last row is the same point as the first one.
+            count = len(self.points)
+            rows = self.rows[(np.arange(count + 1) + self.entry) % count]
+            return rows[::-1] if self.reversed else rows
+        return self.rows[::-1] if self.reversed else self.rows
+
+def layer_groups(layer):
+    # Split a layer into groups: runs of rows of the same feature, and a new group at every travel move.
+    # Groups without printed moves (like the travel to the start of the layer) are left out.
+    # A group whose first row is printed starts at the row before it, so the printed move into the group is kept.
+    # Layers with extruder rows or unset coordinates can't be reordered, so None is returned for those. So are layers
+    # that start with a printed move, because it starts where the previous layer ended.
+    move = layer.move
+    if len(layer) == 0 or move[0] == PRINT or not ((move == PRINT) | (move == TRAVEL)).all():
+        return None
+    if np.isnan(layer.x).any() or np.isnan(layer.y).any() or np.isnan(layer.z).any():
+        return None
+
+    boundaries = np.flatnonzero((move[1:] == TRAVEL) | (layer.feature[1:] != layer.feature[:-1])) + 1
+    groups = []
+    for rows in np.split(np.arange(len(layer)), boundaries):
+        if (move[rows] == PRINT).any():
+            if move[rows[0]] == PRINT:
+                rows = np.concatenate([[rows[0] - 1], rows])
+            groups.append(Group(rows, layer.x, layer.y, layer.z))
+    return groups
+
+def nearest_neighbour(groups, position):
+    # Order the groups by always going to the closest start of a group that hasn't been printed yet
+    ordered = []
+    remaining = list(groups)
+    while remaining:
+        distances = [group.enter_from(position) for group in remaining]
+        best = int(np.argmin(distances))
+        group = remaining.pop(best)
+        # enter_from changed the entry of every remaining group, so set it again for the chosen one
+        group.enter_from(position)
+        ordered.append(group)
+        position = group.ends()[1]
+    return ordered
+
+def two_opt(groups, position, max_passes=20):
+    # Reverse parts of the order while that makes the travel shorter. Reversing a part also reverses every group in it,
+    # so only parts made of reversible groups are reversed.
+    for _ in range(max_passes):
+        improved = False
+        for i in range(len(groups) - 1):
+            starts = np.array([group.ends()[0] for group in groups])
+            ends = np.array([group.ends()[1] for group in groups])
+            before = position if i == 0 else ends[i - 1]
+            # Reversible groups from i onwards that can be part of a reversed part
+            reversible = np.array([group.reversible for group in groups[i:]])
+            count = len(reversible) if reversible.all() else int(np.argmin(reversible))
+            if count < 2:
+                continue
+            j = np.arange(i + 1, i + count)
+            # Travel into the part and out of it, before and after reversing groups i..j
+            after_j = np.minimum(j + 1, len(groups) - 1)
+            has_next = j + 1 < len(groups)
+            old = np.hypot(*(starts[i] - before)) + np.where(has_next, np.hypot(*(starts[after_j] - ends[j]).T), 0)
+            new = np.hypot(*(ends[j] - before).T) + np.where(has_next, np.hypot(*(starts[after_j] - starts[i]).T), 0)
+            gain = old - new
+            best = int(np.argmax(gain))
+            if gain[best] > 1e-9:
+                last = j[best]
+                for group in groups[i:last + 1]:
+                    group.reversed = not group.reversed
+                groups[i:last + 1] = groups[i:last + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return groups
+
+def travel_length(layer, position):
+    # Length of the travel moves of a layer that starts at position (x, y), or None, and where it ends
+    points = np.column_stack([layer.x, layer.y])
+    previous = np.vstack([position if position is not None else points[:1], points[:-1]])
+    lengths = np.nan_to_num(np.hypot(*(points - previous).T))
+    travel = lengths[layer.move == TRAVEL].sum().item()
+    has_point = ~(np.isnan(layer.x) | np.isnan(layer.y))
+    end = points[np.flatnonzero(has_point)[-1]] if has_point.any() else position
+    return travel, end
+
+class TravelOptimizer:
+    """ Reorders the contour, infill, circles and fill lines of every layer to make the travel between them shorter.
+    Every group is started with a travel move. Layers have to be passed in order, because each one starts where the last one ended.
+    Keeps the total travel before and after, to report how much was saved.
+    """
+    def __init__(self):
+        self.position = None
+        self.original_position = None
+        self.travel_before = 0.0
+        self.travel_after = 0.0
+
+    def order(self, layer):
+        travel, self.original_position = travel_length(layer, self.original_position)
+        self.travel_before += travel
+
+        groups = layer_groups(layer)
+        if groups:
+            # The first layer starts where its first group starts
+            start = self.position if self.position is not None else groups[0].ends()[0]
+            groups = two_opt(nearest_neighbour(groups, start), start)
+            rows = np.concatenate([group.ordered_rows() for group in groups])
+            move = np.full(len(rows), PRINT, dtype=np.uint8)
+            move[np.cumsum([0] + [len(group.ordered_rows()) for group in groups[:-1]])] = TRAVEL
+            layer = Toolpath(layer.x[rows], layer.y[rows], layer.z[rows], move, [0, len(rows)], layer.feature[rows])
+
+        travel, self.position = travel_length(layer, self.position)
+        self.travel_after += travel
+        return layer
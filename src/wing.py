@@ -0,0 +1,220 @@
+import numpy as np
+from infill_patterns import layer_infill
+from circle_utils import circle_layers
+from full_fill import fill_shape
+from profile_store import ProfileStore
+from layer_cache import LayerCache, layer_key, array_digest
+from travel_order import TravelOptimizer
+from toolpath import Toolpath, CONTOUR, INFILL, CIRCLES, FILL
+from parallel import parallel_map
+from metrics import Metrics, stage, count, current
+from sections import naca_contour, layer_chords, section_layers
+from plan import section_plan, section_layer_count
+
+# Parsed airfoil profiles are shared by every layer and every config that uses the same file.
+profile_stores = {}
+
+def profile_store(config):
+    key = (config.profile_dir, config.profile_cache_dir)
+    if key not in profile_stores:
+        profile_stores[key] = ProfileStore(config.profile_dir, config.profile_cache_dir)
+    return profile_stores[key]
+
+# Layer caches by (directory, size), shared by every config that uses the same directory.
+layer_caches = {}
+
+def layer_cache(config):
+    if config.layer_cache_dir is None:
+        return None
+    key = (config.layer_cache_dir, config.layer_cache_size_mb)
+    if key not in layer_caches:
+        layer_caches[key] = LayerCache(config.layer_cache_dir, config.layer_cache_size_mb * 2**20)
+    return layer_caches[key]
+
+def calibration(bed_x_max, bed_y_max):
+    calibration = []
+    calibration.append(Toolpath.extruder(on=False))
+    calibration.append(Toolpath.points(bed_x_max, bed_y_max, 10))
+    calibration.append(Toolpath.points(0, 0, 10))
+    calibration.append(Toolpath.extruder(on=True))
+    return Toolpath.concat(calibration)
+
+def section_tolerance(config, i):
+    # contour_tolerance is in mm but the contour is in units of the chord, so it is divided by the largest chord of the section
+    if not config.contour_tolerance:
+        return 0
+    chords = layer_chords(config.chord_lengths[i], config.chord_lengths[i+1], np.array([0.0, 1.0]), config.curved_wing, config.curve_amount)
+    return config.contour_tolerance / np.abs(chords).max().item()
+
+def section_contour(config, i, adaptive=True):
+    # Unit contour of section i. Computed once per section and scaled to every layer of it.
+    # With adaptive=False the point spacing, resampling and simplification settings aren't used.
+    tolerance = section_tolerance(config, i) if adaptive else 0
+    if config.file_extraction:
+        points = config.profile_points if adaptive else None
+        return profile_store(config).load(config.filenames[i], config.interpolate, config.interpolate_airfoil_multiplier, config.sort_point_order, config.reverse_points_sorting, points, tolerance)
+    spacing = config.point_spacing if adaptive else 'uniform'
+    return naca_contour(config.naca_nums[i], config.num_points, spacing, tolerance)
+
+def contour_point_counts(config):
+    # (points without, points with the adaptive settings) of the contour of every section
+    return [(len(section_contour(config, i, adaptive=False)), len(section_contour(config, i))) for i in range(len(config.z_positions) - 1)]
+
+def count_layers(config):
+    return sum(section_layer_count(config, i) for i in range(len(config.z_positions) - 1))
+
+def layer_circles(config, z_values):
+    # x, y and z of the circles of the layers at z_values as (layers, rows) arrays and the move of the rows
+    return circle_layers(config.circle_centers, config.circle_radius, config.circle_offset, config.circle_num_points, config.circle_start_angle, config.circle_segment_angle, z_values)
+
+def build_layer(config, x, y, row, circles=None):
+    # Toolpath of one layer from the x and y of its contour and its row in the layer plan.
+    # circles is the toolpath of the circles of the layer if they were already computed with the other layers.
+    layer_height = config.layer_height
+    z = row["z"].item()
+
+    with stage("contour"):
+        airfoil = Toolpath.points(x, y, z).with_feature(CONTOUR)
+        layer = [airfoil]
+        min_x = x.min().item()
+
+    if row["infill"]:
+        with stage("infill"):
+            layer.append(layer_infill(config, x, y, z).with_feature(INFILL))
+        if config.infill_type == 'modified_triangle_wave':
+            # The wall and the infill are printed twice. The old list based infill appended to the layer
+            # it returned, which was then extended with itself. Kept so that the G-code doesn't change.
+            layer.extend(list(layer))
+
+    if row["circles"]:
+        with stage("circles"):
+            if circles is None:
+                circle_x, circle_y, circle_z, move = layer_circles(config, [z])
+                circles = Toolpath(circle_x[0], circle_y[0], circle_z[0], move)
+            layer.append(circles.with_feature(CIRCLES))
+
+    if row["fill"]:
+        with stage("fill"):
+            layer.append(fill_shape(Toolpath.concat(layer), config.line_width, config.fill_angle, z).with_feature(FILL))
+
+    # After completing the layer, move to next layer using a travel move.
+    with stage("assembly"):
+        layer.insert(0, Toolpath.travel(min_x, 0, z+layer_height))
+        return Toolpath.concat(layer).as_layer()
+
+def layer_inputs(config, row):
+    # The settings that the features of a layer depend on. Settings of features that aren't on the layer are left out,
+    # so changing them doesn't change the layer's key in the layer cache.
+    inputs = [config.layer_height]
+    if row["infill"]:
+        inputs.append(("infill", config.infill_type, config.infill_density, config.infill_reverse, config.infill_rise, config.infill_spacing, config.infill_angle))
+    if row["circles"]:
+        centers = [[(name, center.x, center.y, center.z) for name, center in circle.items()] for circle in config.circle_centers]
+        inputs.append(("circles", centers, config.circle_radius, config.circle_offset, config.circle_num_points, config.circle_start_angle, config.circle_segment_angle))
+    if row["fill"]:
+        inputs.append(("fill", config.line_width, config.fill_angle))
+    return tuple(inputs)
+
+def generate_layers(config, i, start, stop):
+    # Layers start..stop of section i as one toolpath with per-layer offsets.
+    # Each layer only depends on its row in the layer plan, so any range of layers can be generated on its own.
+    plan = section_plan(config, i)[start:stop]
+    with stage("contour"):
+        contour = section_contour(config, i)
+
+    cache = layer_cache(config)
+    if cache is None:
+        return build_layers(config, contour, plan)
+
+    # The range is only generated again when the contour or the chord, position, z or feature settings of one of its layers changed
+    with stage("cache"):
+        key = layer_key(array_digest(contour), [(row["chord"].item(), row["shift"].item(), row["z"].item(), layer_inputs(config, row)) for row in plan])
+        layers = cache.load(key)
+    if layers is None:
+        layers = build_layers(config, contour, plan)
+        with stage("cache"):
+            cache.save(key, layers)
+    return layers
+
+def build_layers(config, contour, plan):
+    # Every layer in the plan is computed at once as (layers, points) arrays.
+    with stage("contour"):
+        x_layers, y_layers, _ = section_layers(contour, plan["chord"], plan["shift"], plan["z"])
+
+    # The circles of every layer too. Only the centers and radii change from layer to layer.
+    if plan["circles"].any():
+        with stage("circles"):
+            circle_x, circle_y, circle_z, circle_move = layer_circles(config, plan["z"])
+
+    layers = []
+    for j, row in enumerate(plan):
+        circles = Toolpath(circle_x[j], circle_y[j], circle_z[j], circle_move) if row["circles"] else None
+        layers.append(build_layer(config, x_layers[j], y_layers[j], row, circles))
+    return Toolpath.concat(layers)
+
+def measured_generate_layers(config, i, start, stop):
+    # generate_layers in a worker process. The stage times are returned so they can be added to the metrics of the main process.
+    with Metrics() as metrics:
+        toolpath = generate_layers(config, i, start, stop)
+    return toolpath, metrics.stage_times, metrics.stage_calls
+
+def measured_chunk(metrics, chunk, stage_times, stage_calls):
+    metrics.add_stages(stage_times, stage_calls)
+    return chunk
+
+def layer_chunks(config):
+    # Split the layers of every section into (section, start, stop) ranges
+    for i in range(len(config.z_positions) - 1):
+        num_layers = section_layer_count(config, i)
+        for start in range(0, num_layers, config.layer_chunk_size):
+            yield i, start, min(start + config.layer_chunk_size, num_layers)
+
+def loft_shapes(config, jobs=None):
+    # Generator that yields the wing one layer at a time, so the whole wing never has to be in memory.
+    # With jobs > 1 the layers are generated in chunks in a process pool and put back in order,
+    # so the output is the same as with a single process.
+    assert len(config.naca_nums) == len(config.z_positions) == len(config.chord_lengths) == len(config.filenames), "Input lists must have the same length. There is a bug in the code or you have inputted different length lists."
+
+    jobs = config.jobs if jobs is None else jobs
+    tasks = ((config, i, start, stop) for i, start, stop in layer_chunks(config))
+    metrics = current()
+    if jobs > 1 and metrics is not None:
+        chunks = (measured_chunk(metrics, *result) for result in parallel_map(measured_generate_layers, tasks, jobs))
+    elif jobs > 1:
+        chunks = parallel_map(generate_layers, tasks, jobs)
+    else:
+        chunks = (generate_layers(*task) for task in tasks)
+
+    for chunk in chunks:
+        for k in range(chunk.num_layers):
+            yield chunk.layer(k)
+
+def wing_toolpaths(config, jobs=None, optimizer=None):
+    # Everything that is printed, in order: calibration moves, the layers of the wing and the z-hop.
+    # With optimize_travel the layers are reordered by optimizer, or a new TravelOptimizer if it isn't given.
+    if config.optimize_travel and optimizer is None:
+        optimizer = TravelOptimizer()
+    if config.calibration_moves:
+        moves = calibration(config.bed_x_max, config.bed_y_max)
+        count(moves, "calibration")
+        yield moves
+
+    for layer in loft_shapes(config, jobs):
+        if config.optimize_travel:
+            with stage("ordering"):
+                layer = optimizer.order(layer)
+        if config.offset_wing:
+            layer = layer.translate(config.offset_x, config.offset_y, config.offset_z)
+        count(layer)
+        yield layer
+
+    if config.z_hop_enabled:
+        z_hop = Toolpath.concat([Toolpath.extruder(on=False), Toolpath.points(np.nan, np.nan, +config.z_hop_amount)])
+        count(z_hop, "z_hop")
+        yield z_hop
+
+def generate(config, jobs=None):
+    """ Generate the wing described by config and return the whole toolpath.
+    Use wing_toolpaths() instead to get it one layer at a time.
+    """
+    return Toolpath.concat(wing_toolpaths(config, jobs))
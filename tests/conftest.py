@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are in src and import each other by name, like when running python src/main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,26 @@
+import numpy as np
+from arc_fitting import ArcMove, find_arcs
+from config import WingConfig
+from toolpath import Toolpath, CONTOUR, CIRCLES, PRINT
+from wing import wing_toolpaths
+
+def test_every_arc_found_is_written():
+    config = WingConfig(z_positions=[0, 0.6], chord_lengths=[100, 100], generate_circle=True, layer_cache_dir=None)
+    toolpath = Toolpath.concat(wing_toolpaths(config, jobs=1))
+    arcs = find_arcs(toolpath, [CONTOUR, CIRCLES], 0.01)
+    # Arcs that start where the previous one ended are normal, so the test needs some
+    assert any(end in arcs for end, _ in arcs.values())
+    steps = toolpath.to_steps(arcs)
+    assert sum(isinstance(step, ArcMove) for step in steps) == len(arcs)
+
+def test_chained_arcs_replace_every_row():
+    # A quarter circle that continues as a wider quarter circle, so the second arc starts where the first one ends
+    angles = np.linspace(0, np.pi / 2, 101)
+    x = np.concatenate([10 * np.cos(angles), 20 * np.cos(angles[1:] + np.pi / 2)])
+    y = np.concatenate([10 * np.sin(angles), 20 * np.sin(angles[1:] + np.pi / 2) - 10])
+    curve = Toolpath(x, y, np.zeros(len(x)), PRINT, (), CIRCLES)
+    arcs = find_arcs(curve, [CIRCLES], 0.01)
+    assert len(arcs) == 2 and arcs[0][0] in arcs
+    steps = curve.to_steps(arcs)
+    assert len(steps) == 3 and all(isinstance(step, ArcMove) for step in steps[1:])
+    assert (steps[-1].end.x, steps[-1].end.y) == (x[-1], y[-1])
@@ -0,0 +1,17 @@
+import pytest
+import parameters
+from config import WingConfig
+
+@pytest.mark.parametrize("name", ["profile_cache_dir", "layer_cache_dir"])
+@pytest.mark.parametrize("value", ["", False, None])
+def test_cache_dirs_can_be_disabled(name, value):
+    assert getattr(WingConfig(**{name: value}), name) is None
+
+def test_replace_updates_extrusion_size_of_module_config():
+    config = WingConfig.from_module(parameters).replace(line_width=0.6, layer_height=0.2)
+    assert config.printer_settings["extrusion_width"] == 0.6
+    assert config.printer_settings["extrusion_height"] == 0.2
+
+def test_explicit_extrusion_size_is_kept():
+    config = WingConfig(printer_settings={"extrusion_width": 0.5}).replace(line_width=0.6)
+    assert config.printer_settings["extrusion_width"] == 0.5
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from full_fill import fill_loops, serpentine
+from toolpath import PRINT
+
+def square(center, size):
+    # Closed square loop as an (n, 2) array
+    x, y = center
+    half = size / 2
+    return np.array([[x - half, y - half], [x + half, y - half], [x + half, y + half], [x - half, y + half]])
+
+def printed_lines(fill):
+    # Start and end points of the printed lines of a fill
+    rows = np.flatnonzero(fill.move == PRINT)
+    return np.column_stack([fill.x[rows - 1], fill.y[rows - 1]]), np.column_stack([fill.x[rows], fill.y[rows]])
+
+@pytest.mark.parametrize("angle", [0, 30, 45, 90])
+def test_hole_is_left_unfilled(angle):
+    outline, hole = square((0, 0), 40), square((5, -3), 12)
+    fill = fill_loops([outline, hole], 0.4, angle, 0.2)
+    starts, ends = printed_lines(fill)
+    assert len(starts) > 0
+
+    # Every line is inside the outline, and no line crosses the hole
+    assert np.all(np.abs(np.concatenate([starts, ends])) <= 20 + 1e-9)
+    samples = starts[:, None, :] + (ends - starts)[:, None, :] * np.linspace(0.01, 0.99, 50)[None, :, None]
+    inside_hole = np.all(np.abs(samples - [5, -3]) < 6 - 1e-6, axis=2)
+    assert not inside_hole.any()
+
+    # The lines cover the outline minus the hole
+    length = np.hypot(*(ends - starts).T).sum()
+    assert length * 0.4 == pytest.approx(40**2 - 12**2, rel=0.05)
+
+def loop_serpentine(start_x, start_y, end_x, end_y):
+    # The line by line version of serpentine
+    swapped = np.zeros(len(start_x), dtype=bool)
+    for k in range(1, len(start_x)):
+        px, py = (start_x[k - 1], start_y[k - 1]) if swapped[k - 1] else (end_x[k - 1], end_y[k - 1])
+        swapped[k] = np.sqrt((start_x[k] - px)**2 + (start_y[k] - py)**2) > np.sqrt((end_x[k] - px)**2 + (end_y[k] - py)**2)
+    return swapped
+
+@pytest.mark.parametrize("seed", range(20))
+def test_serpentine_same_as_loop(seed):
+    rng = np.random.default_rng(seed)
+    count = int(rng.integers(0, 200))
+    lines = rng.integers(-5, 5, (4, count)).astype(np.float64)
+    assert serpentine(*lines).tolist() == loop_serpentine(*lines).tolist()
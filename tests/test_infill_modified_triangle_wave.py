@@ -0,0 +1,91 @@
+import fullcontrol as fc
+import numpy as np
+import pytest
+from infill_modified_triangle_wave import infill_modified_triangle_wave
+
+# The list based infill from before it was vectorized, kept to compare against
+
+def old_find_closest(point, point_list, condition):
+    min_distance = float('inf')
+    closest_point = None
+
+    for p in point_list:
+        # Check if p has a 'z' attribute before trying to access it. Done because of fc.travel_to.
+        if hasattr(p, 'z') and p.z == point.z and ((condition and p.y > 0) or (not condition and p.y < 0)):
+            distance = abs(point.x - p.x)
+            if distance < min_distance:
+                min_distance = distance
+                closest_point = p
+
+    return closest_point
+
+def old_add_step(steps, added, z, condition, direction):
+    closest = old_find_closest(fc.Point(x=added, y=None, z=z), steps, condition)
+    if direction:
+        steps.append(closest if closest and closest.y <= 0 else fc.Point(x=added, y=0, z=z))
+    else:
+        steps.append(closest if closest and closest.y >= 0 else fc.Point(x=added, y=0, z=z))
+    return steps
+
+def old_infill_modified_triangle_wave(steps, z, min_x, max_x, infill_density, infill_reverse, layer_height, infill_rise):
+    s_density = max_x / infill_density
+
+    if infill_reverse:
+        for i in range(infill_density - 1, 0, -1):
+            added = s_density * i
+            condition = (i+1) % 2 == 0  # Shift condition for second half to meet the first half at y=0.
+            steps = old_add_step(steps, added, z, condition, False)
+
+        steps.append(fc.Point(x=min_x, y=0, z=z))
+
+        for i in range(1, infill_density):
+            added = s_density * i
+            condition = i % 2 == 0  # Maintain original condition for first half
+            steps = old_add_step(steps, added, z, condition, True)
+
+        steps.append(fc.Point(x=max_x, y=0, z=z))
+    else:
+        for i in range(1, infill_density):
+            added = s_density * i
+            condition = i % 2 == 0  # Maintain original condition for first half
+            steps = old_add_step(steps, added, z, condition, True)
+
+        steps.append(fc.Point(x=max_x, y=0, z=z))
+
+        for i in range(infill_density - 1, 0, -1):
+            added = s_density * i
+            condition = (i+1) % 2 == 0  # Shift condition for second half to meet the first half at y=0.
+            steps = old_add_step(steps, added, z, condition, False)
+
+    if infill_rise:
+        steps.append(fc.Point(x=min_x, y=0, z=z+layer_height/2))
+    else:
+        steps.append(fc.Point(x=min_x, y=0, z=z))
+
+    return steps
+
+def random_contour(rng):
+    # x on a coarse grid so that many points are exactly as close to an infill position, y of both signs and 0
+    count = int(rng.integers(3, 60))
+    x = rng.integers(0, 40, count) * rng.choice([0.5, 1.25, 2.5])
+    y = rng.choice([-1, 0, 1], count) * rng.integers(0, 5, count) * 0.75
+    return x.astype(np.float64), y.astype(np.float64)
+
+@pytest.mark.parametrize("seed", range(100))
+@pytest.mark.parametrize("infill_reverse", [False, True])
+@pytest.mark.parametrize("infill_rise", [False, True])
+def test_same_as_list_based_infill(seed, infill_reverse, infill_rise):
+    rng = np.random.default_rng(seed)
+    x, y = random_contour(rng)
+    z = 0.3 * int(rng.integers(0, 10))
+    density = int(rng.integers(2, 12))
+    min_x, max_x = x.min().item(), x.max().item()
+
+    contour = [fc.Point(x=px, y=py, z=z) for px, py in zip(x.tolist(), y.tolist())]
+    expected = old_infill_modified_triangle_wave(list(contour), z, min_x, max_x, density, infill_reverse, 0.3, infill_rise)[len(contour):]
+    infill = infill_modified_triangle_wave(x, y, z, min_x, max_x, density, infill_reverse, 0.3, infill_rise)
+
+    assert len(infill) == len(expected)
+    assert infill.x.tolist() == [point.x for point in expected]
+    assert infill.y.tolist() == [point.y for point in expected]
+    assert infill.z.tolist() == [point.z for point in expected]
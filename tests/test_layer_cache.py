@@ -0,0 +1,42 @@
+import os
+import numpy as np
+from config import WingConfig
+from layer_cache import LayerCache
+from toolpath import Toolpath
+from wing import loft_shapes
+
+def layers(rows):
+    return Toolpath.points(np.arange(rows), 0, 0).as_layer()
+
+def test_corrupt_file_is_a_miss(tmp_path):
+    cache = LayerCache(str(tmp_path), 2**20)
+    cache.save("ab" * 20, layers(10))
+    assert len(cache.load("ab" * 20)) == 10
+    # A damaged file, for example on a disk that filled up
+    with open(cache.path("ab" * 20), 'r+b') as file:
+        file.truncate(100)
+    assert cache.load("ab" * 20) is None
+
+def test_unwritable_folder_is_a_miss(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = LayerCache(str(blocker / "layers"), 2**20)
+    cache.save("ab" * 20, layers(10))
+    assert cache.load("ab" * 20) is None
+    assert os.listdir(tmp_path) == ["file"]
+
+def test_wing_is_generated_with_a_broken_cache(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    settings = {"z_positions": [0, 3], "chord_lengths": [100, 80], "num_points": 64}
+    expected = Toolpath.concat(loft_shapes(WingConfig(layer_cache_dir=None, **settings), jobs=1))
+    toolpath = Toolpath.concat(loft_shapes(WingConfig(layer_cache_dir=str(blocker / "layers"), **settings), jobs=1))
+    assert np.array_equal(toolpath.x, expected.x)
+
+def test_replaced_file_is_counted_once(tmp_path):
+    cache = LayerCache(str(tmp_path), 2**30)
+    cache.save("ab" * 20, layers(10))
+    cache.save("cd" * 20, layers(10))
+    for _ in range(5):
+        cache.save("ab" * 20, layers(1000))
+    assert cache.size == sum(size for _, size, _ in cache.files())
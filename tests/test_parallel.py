@@ -0,0 +1,19 @@
+import numpy as np
+from config import WingConfig
+from toolpath import Toolpath
+from wing import layer_chunks, loft_shapes
+
+def test_parallel_layers_are_the_same_as_serial():
+    # Three sections whose layer counts aren't multiples of the chunk size, so the last chunk of a section is short
+    # and the next chunk starts on the next section
+    config = WingConfig(z_positions=[0, 2.1, 4.5], chord_lengths=[100, 90, 70], naca_nums=['2412', '0012', '2412'],
+                        filenames=['naca2412.dat'] * 3, num_points=64, layer_chunk_size=3, layer_cache_dir=None,
+                        generate_circle=True, filled_layers_enabled=True, filled_layers=[0, 2.1, 2.4])
+    chunks = list(layer_chunks(config))
+    assert any(stop - start < config.layer_chunk_size for _, start, stop in chunks)
+    assert len({i for i, _, _ in chunks}) == 2
+
+    serial = Toolpath.concat(loft_shapes(config, jobs=1))
+    parallel = Toolpath.concat(loft_shapes(config, jobs=2))
+    for name in ("x", "y", "z", "move", "feature", "layer_offsets"):
+        assert np.array_equal(getattr(parallel, name), getattr(serial, name), equal_nan=name in ("x", "y", "z")), name
@@ -0,0 +1,30 @@
+import numpy as np
+from config import WingConfig
+from preview import Preview, read_line_buffer, write_line_buffer
+from toolpath import PRINT, TRAVEL
+from wing import wing_toolpaths
+
+def test_line_buffer_layers(tmp_path):
+    config = WingConfig(z_positions=[0, 3], chord_lengths=[100, 80], num_points=64, layer_cache_dir=None,
+                        calibration_moves=True, z_hop_enabled=True, preview_layer_step=3, preview_max_points=40)
+    preview = Preview.from_config(config)
+    for _ in preview.collect(wing_toolpaths(config)):
+        pass
+    toolpaths = preview.toolpaths()
+    layers = [toolpath for toolpath in toolpaths if toolpath.num_layers]
+
+    path = tmp_path / "preview.bin"
+    vertices = write_line_buffer(toolpaths, path)
+    positions, flags, layer_ranges = read_line_buffer(path)
+    assert len(positions) == len(flags) == vertices
+    assert len(layer_ranges) == len(layers)
+
+    # Every layer range only has the vertices of that layer
+    for layer, (start, end) in zip(layers, layer_ranges.tolist()):
+        assert end - start == np.count_nonzero((layer.move == PRINT) | (layer.move == TRAVEL))
+        assert set(positions[start:end, 2].tolist()) <= set(layer.z.astype(np.float32).tolist())
+
+    # The calibration moves come before the first layer and the z-hop after the last one
+    assert layer_ranges[0, 0] > 0
+    assert layer_ranges[-1, 1] < vertices
+    assert positions[layer_ranges[-1, 1]:, 2].max() >= config.z_hop_amount
@@ -0,0 +1,22 @@
+import os
+import shutil
+import numpy as np
+from profile_store import ProfileStore
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "profiles")
+
+def test_unwritable_cache_dir_parses_the_file(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    expected = ProfileStore(PROFILE_DIR).load("naca2412.dat")
+    profile = ProfileStore(PROFILE_DIR, str(blocker / "profiles")).load("naca2412.dat")
+    assert np.array_equal(profile, expected)
+    assert os.listdir(tmp_path) == ["file"]
+
+def test_damaged_cache_file_parses_the_file(tmp_path):
+    shutil.copy(os.path.join(PROFILE_DIR, "naca2412.dat"), tmp_path)
+    cache_dir = tmp_path / "cache"
+    expected = ProfileStore(str(tmp_path), str(cache_dir)).load("naca2412.dat")
+    for path in cache_dir.iterdir():
+        path.write_bytes(path.read_bytes()[:20])
+    assert np.array_equal(ProfileStore(str(tmp_path), str(cache_dir)).load("naca2412.dat"), expected)
@@ -0,0 +1,30 @@
+from collections import Counter
+import numpy as np
+import pytest
+from config import WingConfig
+from toolpath import PRINT
+from travel_order import TravelOptimizer
+from wing import loft_shapes
+
+def printed_segments(layer):
+    # Multiset of the printed moves of a layer as unordered pairs of their end points
+    points = np.round(np.column_stack([layer.x, layer.y, layer.z]), 9)
+    segments = Counter()
+    for row in np.flatnonzero(layer.move == PRINT).tolist():
+        if row > 0:
+            segments[tuple(sorted([tuple(points[row - 1]), tuple(points[row])]))] += 1
+    return segments
+
+@pytest.mark.parametrize("settings", [
+    {},
+    {"generate_circle": True},
+    {"generate_circle": True, "filled_layers_enabled": True, "filled_layers": [0, 0.6]},
+    {"infill_type": "gyroid", "generate_circle": True},
+])
+def test_order_keeps_printed_segments(settings):
+    config = WingConfig(z_positions=[0, 3], chord_lengths=[100, 80], num_points=64, layer_cache_dir=None, **settings)
+    optimizer = TravelOptimizer()
+    for layer in loft_shapes(config, jobs=1):
+        ordered = optimizer.order(layer)
+        assert printed_segments(ordered) == printed_segments(layer)
+    assert optimizer.travel_after <= optimizer.travel_before